@@ -0,0 +1,244 @@
+"""Micro-benchmarks des chemins chauds du cog, sans Discord ni base de données.
+
+python -m benchmarks.hot_paths                     # compare à benchmarks/baseline.json
+python -m benchmarks.hot_paths --update-baseline   # réécrit la référence
+python -m benchmarks.hot_paths --output results.json
+
+Les temps sont rapportés à une boucle d'étalonnage mesurée juste avant chaque
+répétition de chaque cas : la référence reste comparable d'une machine à l'autre
+(CI plus lente, poste plus rapide) et une dérive du processeur en cours de route
+touche l'étalonnage comme le cas. Chaque cas retient la médiane de ses répétitions.
+Les cas courts (quelques dizaines de µs) restent bruités : sous --floor (en unités
+d'étalonnage), ils sont jugés avec la tolérance plus large --small-tolerance.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import timeit
+from datetime import datetime
+from pathlib import Path
+
+# config.py exige un token : aucun appel Discord n'est fait ici
+os.environ.setdefault("DISCORD_TOKEN", "benchmark")
+
+from cogs.activity import WeaponConfigModal
+from services.embed_renderer import EmbedRenderer, paginate
+from services.slot_layout import SlotLayout
+
+BASELINE = Path(__file__).with_name("baseline.json")
+SIZES = (5, 25, 100, 500)
+EVENT_DATE = datetime(2026, 1, 31, 20, 0)
+
+
+class FakeRegistration:
+    __slots__ = ("role_name", "weapon", "slot_number")
+
+    def __init__(self, role_name, weapon, slot_number):
+        self.role_name = role_name
+        self.weapon = weapon
+        self.slot_number = slot_number
+
+
+def weapons_text(size: int) -> dict:
+    """Textes de modal donnant environ `size` slots (1/5 Tank, 1/5 Healer, 3/5 DPS)"""
+    shares = {"Tank": size // 5 or 1, "Healer": size // 5 or 1}
+    shares["DPS"] = max(size - shares["Tank"] - shares["Healer"], 1)
+    texts = {}
+    for role_name, total in shares.items():
+        # Trois armes par rôle au plus, le reste sur la dernière
+        counts = [total // 3] * 2 + [total - 2 * (total // 3)]
+        texts[role_name] = ", ".join(
+            f"{role_name} Weapon {n}:{count}" for n, count in enumerate(counts) if count
+        )
+    return texts
+
+
+def roster(layout: SlotLayout, ratio: float) -> dict:
+    """Occupants d'une proportion des slots (mentions de snowflakes réalistes)"""
+    taken = int(layout.total * ratio)
+    return {slot: 10**18 + slot for slot in range(1, taken + 1)}
+
+
+def cases(size: int) -> dict:
+    """Fonctions à mesurer pour une taille de roster"""
+    texts = weapons_text(size)
+    config = {
+        role_name: WeaponConfigModal.parse_weapons(text)
+        for role_name, text in texts.items()
+    }
+    layout = SlotLayout.from_config(config)
+    slot_to_user = roster(layout, 0.8)
+
+    # Nouvelle disposition : une arme de DPS en moins, les inscrits sont redistribués
+    dps = list(layout.weapons("DPS"))
+    smaller = SlotLayout.from_config({**config, "DPS": dict(dps[:-1] or dps)})
+    registrations = [
+        FakeRegistration(*layout.resolve(slot), slot) for slot in slot_to_user
+    ]
+
+    warm = EmbedRenderer(0)
+    warm.render(1, "Raid", EVENT_DATE, 7, layout, slot_to_user)
+    changed = dict(slot_to_user)
+    last = max(changed)
+
+    def render_cold():
+        # Premier rendu : tous les champs sont construits
+        renderer = EmbedRenderer(0)
+        for page in range(len(paginate(layout))):
+            renderer.render(1, "Raid", EVENT_DATE, 7, layout, slot_to_user, page)
+
+    def render_one_change():
+        # Une inscription bascule : seul le champ concerné est reconstruit
+        if last in changed:
+            del changed[last]
+        else:
+            changed[last] = 42
+        for page in range(len(paginate(layout))):
+            warm.render(1, "Raid", EVENT_DATE, 7, layout, changed, page)
+
+    return {
+        "parse_weapons": lambda: [
+            WeaponConfigModal.parse_weapons(text) for text in texts.values()
+        ],
+        "resolve_slot": lambda: [layout.resolve(slot) for slot in (1, size // 2, size)],
+        "render_cold": render_cold,
+        "render_one_change": render_one_change,
+        "rebalance": lambda: smaller.reassign(registrations),
+    }
+
+
+def calibration():
+    """Charge Python pure de référence : chaînes, dictionnaire, tri"""
+    labels = {n: f"`{n}.` Weapon {n % 7}" for n in range(200)}
+    return sorted(", ".join(labels.values()).split(", "), reverse=True)
+
+
+class Clock:
+    """Temps par appel d'une fonction, en microsecondes, sur ~50 ms par mesure"""
+
+    def __init__(self, func):
+        self.timer = timeit.Timer(func)
+        number, elapsed = self.timer.autorange()
+        self.number = max(int(number * 0.05 / elapsed), 1)
+
+    def __call__(self) -> float:
+        return self.timer.timeit(self.number) / self.number * 1e6
+
+
+def measure(func, unit: Clock, repeat: int) -> tuple:
+    """Médianes du temps par appel (µs) et du temps relatif à l'étalonnage"""
+    clock = Clock(func)
+    micros, relative = [], []
+    for _ in range(repeat):
+        # Étalonnage et cas mesurés côte à côte : une dérive touche les deux
+        reference = unit()
+        elapsed = clock()
+        micros.append(elapsed)
+        relative.append(elapsed / reference)
+    return statistics.median(micros), statistics.median(relative)
+
+
+def run(repeat: int = 11) -> dict:
+    """Temps absolus (µs) et relatifs à l'étalonnage de chaque cas"""
+    unit = Clock(calibration)
+    micros, relative = {}, {}
+    for size in SIZES:
+        for name, func in cases(size).items():
+            key = f"{name}[{size}]"
+            micros[key], relative[key] = measure(func, unit, repeat)
+    return {
+        "calibration_us": round(statistics.median(unit() for _ in range(repeat)), 3),
+        "cases": {name: round(value, 4) for name, value in relative.items()},
+        "micros": {name: round(value, 3) for name, value in micros.items()},
+    }
+
+
+def compare(
+    results: dict,
+    baseline: dict,
+    tolerance: float,
+    floor: float,
+    small_tolerance: float,
+) -> list:
+    """Cas plus lents que la référence au-delà de la tolérance (temps relatifs)"""
+    regressions = []
+    for name, relative in results["cases"].items():
+        micros = results["micros"][name]
+        reference = baseline["cases"].get(name)
+        status = "🆕"
+        if reference:
+            ratio = relative / reference
+            # Les cas sous le plancher sont trop courts pour la tolérance normale
+            allowed = small_tolerance if reference < floor else tolerance
+            status = "❌" if ratio > 1 + allowed else "✅"
+            if status == "❌":
+                regressions.append(name)
+            print(
+                f"{status} {name:<28} {micros:>10.2f} µs  "
+                f"({relative:.2f} u, réf. {reference:.2f} u, x{ratio:.2f})"
+            )
+        else:
+            print(f"{status} {name:<28} {micros:>10.2f} µs  ({relative:.2f} u)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", help="Écrire les résultats JSON dans ce fichier")
+    parser.add_argument("--baseline", default=str(BASELINE))
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="Ralentissement relatif toléré avant échec (0.25 = +25%%)",
+    )
+    parser.add_argument(
+        "--floor",
+        type=float,
+        default=0.5,
+        help="Sous ce temps de référence (en unités), appliquer --small-tolerance",
+    )
+    parser.add_argument(
+        "--small-tolerance",
+        type=float,
+        default=1.0,
+        help="Ralentissement toléré pour les cas sous --floor (1.0 = +100%%)",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=11, help="Répétitions par cas (médiane)"
+    )
+    args = parser.parse_args()
+
+    results = run(args.repeat)
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2) + "\n")
+
+    baseline_path = Path(args.baseline)
+    if args.update_baseline or not baseline_path.exists():
+        reference = {key: results[key] for key in ("calibration_us", "cases")}
+        baseline_path.write_text(json.dumps(reference, indent=2) + "\n")
+        print(f"📌 Référence écrite : {baseline_path}")
+        return 0
+
+    baseline = json.loads(baseline_path.read_text())
+    if "cases" not in baseline:
+        # Ancien format : µs absolus, propres à la machine qui les a produits
+        print("❌ Référence en temps absolus : la régénérer avec --update-baseline")
+        return 1
+
+    print(f"📏 Étalonnage : {results['calibration_us']:.2f} µs = 1 u")
+    regressions = compare(
+        results, baseline, args.tolerance, args.floor, args.small_tolerance
+    )
+    if regressions:
+        print(f"❌ {len(regressions)} régression(s) : {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
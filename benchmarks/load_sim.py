@@ -0,0 +1,458 @@
+"""Simulateur de charge de bout en bout : le cog réel face à un faux Discord.
+
+python -m benchmarks.load_sim                                  # 200 joueurs pour 25 slots
+python -m benchmarks.load_sim --scenario churn --activities 10 --users 500
+python -m benchmarks.load_sim --scenario reminders --activities 20 --slots 100
+python -m benchmarks.load_sim --rest-latency 80 --rate-limit 0.05 --output sim.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+# config.py exige un token : aucune connexion à Discord n'est ouverte ici
+os.environ.setdefault("DISCORD_TOKEN", "simulation")
+
+import discord
+from sqlalchemy import event, func, select
+
+from cogs.activity import ActivityCog, WeaponConfigModal
+from database.database import Database
+from database.session_guard import HELD_DURING_IO, check_session_released
+from database.models import Registration, ScheduledJob
+from services.metrics import Metrics
+from services.slot_layout import SlotLayout
+
+
+class FakeRest:
+    """Bouchon de l'API REST : latence simulée, 429 aléatoires, comptage des appels"""
+
+    def __init__(self, latency_ms: float, rate_limit: float, seed: int):
+        self.latency = latency_ms / 1000
+        self.rate_limit = rate_limit
+        self.random = random.Random(seed)
+        self.calls = Counter()
+        self.rate_limited = 0
+        self._ids = iter(range(10**17, 10**18))
+
+    def next_id(self) -> int:
+        return next(self._ids)
+
+    async def call(self, route: str):
+        # Aucun appel Discord ne doit partir d'une unité de travail ouverte
+        check_session_released(route)
+        self.calls[route] += 1
+        # Latence à queue longue : la plupart des appels sont rapides, quelques-uns non
+        await asyncio.sleep(self.random.expovariate(1 / self.latency))
+        # Les réponses d'interaction ont leur propre jeton : pas de 429 simulé
+        if route.startswith("interaction."):
+            return
+        if self.random.random() < self.rate_limit:
+            self.rate_limited += 1
+            # Au-delà de max_ratelimit_timeout, discord.py lève RateLimited
+            raise discord.RateLimited(self.random.uniform(0.05, 0.5))
+
+
+class FakeMessage:
+    def __init__(self, rest, channel, message_id):
+        self.rest = rest
+        self.channel = channel
+        self.id = message_id
+
+    async def edit(self, **kwargs):
+        await self.rest.call("message.edit")
+
+    async def delete(self):
+        await self.rest.call("message.delete")
+
+    async def create_thread(self, name, auto_archive_duration=None):
+        await self.rest.call("message.create_thread")
+        return self.channel.bot.add_channel(FakeThread(self.rest, self.channel.bot))
+
+
+class FakeChannel:
+    def __init__(self, rest, bot):
+        self.rest = rest
+        self.bot = bot
+        self.id = rest.next_id()
+        self.mention = f"<#{self.id}>"
+
+    def get_partial_message(self, message_id):
+        return FakeMessage(self.rest, self, message_id)
+
+    async def send(self, content=None, **kwargs):
+        await self.rest.call("channel.send")
+        return FakeMessage(self.rest, self, self.rest.next_id())
+
+    async def edit(self, **kwargs):
+        await self.rest.call("channel.edit")
+
+
+class FakeThread(FakeChannel, discord.Thread):
+    # Les handlers vérifient isinstance(interaction.channel, discord.Thread)
+    def __init__(self, rest, bot):
+        FakeChannel.__init__(self, rest, bot)
+
+    @property
+    def mention(self):
+        return f"<#{self.id}>"
+
+    @mention.setter
+    def mention(self, value):
+        pass
+
+
+class FakeUser:
+    def __init__(self, user_id: int):
+        self.id = user_id
+        self.name = f"joueur{user_id}"
+        self.mention = f"<@{user_id}>"
+
+    async def send(self, content):
+        pass
+
+
+class FakeResponse:
+    def __init__(self, rest):
+        self.rest = rest
+
+    async def defer(self, **kwargs):
+        await self.rest.call("interaction.defer")
+
+    async def send_message(self, content=None, **kwargs):
+        await self.rest.call("interaction.respond")
+
+    async def send_modal(self, modal):
+        await self.rest.call("interaction.respond")
+
+
+class FakeFollowup:
+    def __init__(self, rest):
+        self.rest = rest
+        self.messages = []
+
+    async def send(self, content=None, **kwargs):
+        await self.rest.call("interaction.followup")
+        self.messages.append(content)
+
+
+class FakeInteraction:
+    """Interaction synthétique : seuls les attributs lus par le cog existent"""
+
+    def __init__(self, rest, channel, user, guild_id: int):
+        self.channel = channel
+        self.user = user
+        self.guild = FakeUser(guild_id)
+        self.response = FakeResponse(rest)
+        self.followup = FakeFollowup(rest)
+        self.extras = {}
+        self.command = None
+
+
+class FakeBot:
+    """Passerelle minimale : cache des salons et utilisateurs"""
+
+    def __init__(self, db, rest):
+        self.db = db
+        self.rest = rest
+        self.latency = 0.05
+        self.channels = {}
+        self.metrics = Metrics()
+
+    def add_channel(self, channel):
+        self.channels[channel.id] = channel
+        return channel
+
+    def get_channel(self, channel_id):
+        return self.channels.get(channel_id)
+
+    async def fetch_channel(self, channel_id):
+        await self.rest.call("channel.fetch")
+        return self.channels[channel_id]
+
+    def get_user(self, user_id):
+        return FakeUser(user_id)
+
+    async def fetch_user(self, user_id):
+        return FakeUser(user_id)
+
+    async def wait_until_ready(self):
+        pass
+
+
+def count_statements(db) -> Counter:
+    """Compter les requêtes SQL émises, par verbe"""
+    statements = Counter()
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        statements[statement.split(None, 1)[0].upper()] += 1
+
+    event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+    return statements
+
+
+def roles_for(slots: int) -> dict:
+    tank = max(slots // 5, 1)
+    healer = max(slots // 5, 1)
+    return {
+        "Tank": {"Greataxe": tank},
+        "Healer": {"Holy Staff": healer},
+        "DPS": {"Bow": max(slots - tank - healer, 1)},
+    }
+
+
+class Simulation:
+    def __init__(self, args):
+        self.args = args
+        self.rest = FakeRest(args.rest_latency, args.rate_limit, args.seed)
+        self.random = random.Random(args.seed)
+        self.samples = {}
+        self.outcomes = Counter()
+
+    async def setup(self):
+        self.db = Database(self.args.database_url)
+        await self.db.create_schema()
+        self.statements = count_statements(self.db)
+        self.bot = FakeBot(self.db, self.rest)
+        self.cog = ActivityCog(self.bot)
+        await self.cog.cog_load()
+        await self.cog.startup_task
+        self.guild_id = self.rest.next_id()
+
+    async def create_activity(self, slots: int):
+        channel = self.bot.add_channel(FakeChannel(self.rest, self.bot))
+        interaction = FakeInteraction(self.rest, channel, FakeUser(1), self.guild_id)
+        modal = WeaponConfigModal(
+            title=f"Raid {len(self.cog.registry) + 1}",
+            event_datetime=datetime.now() + timedelta(days=1),
+            leader=FakeUser(1),
+            ping_role=FakeUser(2),
+            cog=self.cog,
+        )
+        modal.ping_role.name = "raid"
+        before = set(self.cog.registry.by_id)
+        await modal.create_new_activity(
+            interaction, SlotLayout.from_config(roles_for(slots))
+        )
+        [activity_id] = set(self.cog.registry.by_id) - before
+        state = self.cog.registry.get(activity_id)
+        return state, self.bot.channels[state.thread_id]
+
+    async def command(self, name: str, thread, user_id: int, *args):
+        """Exécuter une commande slash et mesurer sa latence jusqu'à la réponse"""
+        interaction = FakeInteraction(self.rest, thread, FakeUser(user_id), 0)
+        callback = getattr(ActivityCog, name).callback
+        started = time.perf_counter()
+        await callback(self.cog, interaction, *args)
+        self.samples.setdefault(name, []).append(time.perf_counter() - started)
+        reply = (
+            interaction.followup.messages[-1] if interaction.followup.messages else ""
+        )
+        self.outcomes[f"{name}:{'ok' if reply.startswith('✅') else 'refusé'}"] += 1
+        return reply
+
+    async def arrivals(self, count: int, make):
+        """Lancer `count` commandes selon un processus de Poisson (--rate par seconde)"""
+        tasks = []
+        for index in range(count):
+            tasks.append(asyncio.create_task(make(index)))
+            if self.args.rate:
+                await asyncio.sleep(self.random.expovariate(self.args.rate))
+        return await asyncio.gather(*tasks)
+
+    async def scenario_race(self):
+        """Tous les joueurs visent les mêmes slots d'une seule activité"""
+        state, thread = await self.create_activity(self.args.slots)
+        successes = Counter()
+
+        async def join(index):
+            user_id = 10**6 + index
+            slot = self.random.randint(1, state.layout.total)
+            reply = await self.command("party_join", thread, user_id, slot)
+            if reply.startswith("✅"):
+                successes[slot] += 1
+
+        await self.arrivals(self.args.users, join)
+        return {
+            "reported_double_bookings": sum(n - 1 for n in successes.values() if n > 1)
+        }
+
+    async def scenario_churn(self):
+        """Inscriptions et départs répartis sur plusieurs activités"""
+        activities = [
+            await self.create_activity(self.args.slots)
+            for _ in range(self.args.activities)
+        ]
+
+        async def act(index):
+            # Chaque joueur enchaîne quelques actions : les départs suivent les inscriptions
+            user_id = 10**6 + index
+            for _ in range(3):
+                state, thread = self.random.choice(activities)
+                if user_id in state.user_to_slot and self.random.random() < 0.5:
+                    await self.command("party_leave", thread, user_id)
+                else:
+                    slot = self.random.randint(1, state.layout.total)
+                    await self.command("party_join", thread, user_id, slot)
+
+        await self.arrivals(self.args.users, act)
+        return {}
+
+    async def scenario_reminders(self):
+        """Rosters pleins, puis tous les rappels et départs déclenchés en même temps"""
+        activities = [
+            await self.create_activity(self.args.slots)
+            for _ in range(self.args.activities)
+        ]
+
+        async def join(index):
+            state, thread = activities[index % len(activities)]
+            slot = index // len(activities) + 1
+            await self.command("party_join", thread, 10**6 + index, slot)
+
+        await self.arrivals(self.args.slots * len(activities), join)
+
+        async with self.db.unit_of_work() as session:
+            job_ids = (
+                await session.scalars(
+                    select(ScheduledJob.id).filter_by(status="pending")
+                )
+            ).all()
+
+        async def fire(job_id):
+            started = time.perf_counter()
+            await self.cog.on_deadline(job_id)
+            self.samples.setdefault("deadline", []).append(
+                time.perf_counter() - started
+            )
+
+        await asyncio.gather(*(fire(job_id) for job_id in job_ids))
+        return {}
+
+    async def check(self) -> dict:
+        """Violations : slot ou joueur en double, mémoire et base divergentes"""
+        async with self.db.unit_of_work() as session:
+            rows = (await session.scalars(select(Registration))).all()
+            duplicates = (
+                await session.execute(
+                    select(Registration.activity_id, Registration.slot_number)
+                    .group_by(Registration.activity_id, Registration.slot_number)
+                    .having(func.count() > 1)
+                )
+            ).all()
+
+        in_db = {}
+        for reg in rows:
+            in_db.setdefault(reg.activity_id, {})[reg.slot_number] = reg.user_id
+        divergent = [
+            state.id
+            for state in self.cog.registry.by_id.values()
+            if state.slot_to_user != in_db.get(state.id, {})
+        ]
+        users = Counter((reg.activity_id, reg.user_id) for reg in rows)
+        return {
+            "session_held_during_rest": sum(HELD_DURING_IO.values()),
+            "double_booked_slots": len(duplicates),
+            "double_registered_users": sum(1 for n in users.values() if n > 1),
+            "registry_divergences": len(divergent),
+            "registrations": len(rows),
+        }
+
+    async def run(self) -> dict:
+        await self.setup()
+        scenario = getattr(self, f"scenario_{self.args.scenario}")
+
+        statements_before = Counter(self.statements)
+        rest_before = Counter(self.rest.calls)
+        started = time.perf_counter()
+        violations = await scenario()
+        elapsed = time.perf_counter() - started
+
+        # Laisser partir les éditions d'embed regroupées avant de compter
+        await self.cog.cog_unload()
+        violations.update(await self.check())
+
+        commands = sum(len(samples) for samples in self.samples.values())
+        report = {
+            "scenario": self.args.scenario,
+            "commands": commands,
+            "elapsed_s": round(elapsed, 3),
+            "throughput_per_s": round(commands / elapsed, 1) if elapsed else None,
+            "latency_ms": {
+                name: percentiles(samples) for name, samples in self.samples.items()
+            },
+            "outcomes": dict(self.outcomes),
+            "db_statements": sum((self.statements - statements_before).values()),
+            "db_statements_by_verb": dict(self.statements - statements_before),
+            "rest_calls": sum((self.rest.calls - rest_before).values()),
+            "rest_calls_by_route": dict(self.rest.calls - rest_before),
+            "rest_429": self.rest.rate_limited,
+            "outbound": self.cog.outbound.snapshot(),
+            "violations": violations,
+        }
+        await self.db.close()
+        return report
+
+
+def percentiles(samples) -> dict:
+    ordered = sorted(samples)
+
+    def at(q):
+        return round(ordered[min(int(q * len(ordered)), len(ordered) - 1)] * 1000, 2)
+
+    return {"p50": at(0.50), "p99": at(0.99), "max": round(ordered[-1] * 1000, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--scenario", choices=("race", "churn", "reminders"), default="race"
+    )
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--slots", type=int, default=25)
+    parser.add_argument("--activities", type=int, default=5)
+    parser.add_argument(
+        "--rate", type=float, default=0, help="Commandes par seconde (0 = rafale)"
+    )
+    parser.add_argument("--rest-latency", type=float, default=50, help="ms")
+    parser.add_argument(
+        "--rate-limit", type=float, default=0.01, help="Probabilité d'un 429"
+    )
+    parser.add_argument("--database-url")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Écrire le rapport JSON dans ce fichier")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        if not args.database_url:
+            args.database_url = f"sqlite+aiosqlite:///{directory}/simulation.db"
+        report = asyncio.run(Simulation(args).run())
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+
+    # Toute violation de cohérence fait échouer la simulation
+    return 1 if any(report["violations"].get(key) for key in VIOLATIONS) else 0
+
+
+VIOLATIONS = (
+    "session_held_during_rest",
+    "double_booked_slots",
+    "double_registered_users",
+    "registry_divergences",
+    "reported_double_bookings",
+)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
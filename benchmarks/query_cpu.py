@@ -0,0 +1,226 @@
+"""Temps CPU par commande : requêtes ORM construites à chaque appel vs database.queries.
+
+python -m benchmarks.query_cpu                      # SQLite (aiosqlite et repli synchrone)
+python -m benchmarks.query_cpu --iterations 2000 --roster 100
+python -m benchmarks.query_cpu --output cpu.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# config.py exige un token : aucune connexion à Discord n'est ouverte ici
+os.environ.setdefault("DISCORD_TOKEN", "benchmark")
+
+from sqlalchemy import delete, select
+
+from database import queries
+from database.database import Database
+from database.models import Activity, ActivityMessage, Registration, ScheduledJob
+from services.registry import ActivityRegistry
+
+THREAD_ID = 2 * 10**17
+USER_ID = 10**17
+
+
+async def seed(db, roster: int):
+    """Une activité, son roster, deux pages de suite et deux échéances"""
+    async with db.unit_of_work() as session:
+        activity = Activity(
+            message_id=10**17,
+            thread_id=THREAD_ID,
+            channel_id=1,
+            guild_id=1,
+            title="Raid",
+            leader=1,
+            event_date=datetime.now() + timedelta(days=1),
+            ping_role_id=1,
+            roles_config=[["DPS", [["Bow", roster + 1]]]],
+            reminders=[],
+        )
+        session.add(activity)
+        await session.flush()
+        session.add_all(
+            Registration(
+                activity_id=activity.id,
+                user_id=10**16 + slot,
+                role_name="DPS",
+                weapon="Bow",
+                slot_number=slot,
+            )
+            for slot in range(1, roster + 1)
+        )
+        session.add_all(
+            ActivityMessage(
+                activity_id=activity.id, page=page, message_id=10**15 + page
+            )
+            for page in (1, 2)
+        )
+        jobs = [
+            ScheduledJob(activity_id=activity.id, kind=kind, fire_at=datetime.now())
+            for kind in ("reminder", "start")
+        ]
+        session.add_all(jobs)
+        await session.flush()
+        return activity.id, jobs[0].id
+
+
+def orm_commands(db, activity_id: int, job_id: int, slot: int) -> dict:
+    """Formes d'origine : instructions et objets ORM reconstruits à chaque appel"""
+
+    async def join_leave():
+        async with db.unit_of_work() as session:
+            session.add(
+                Registration(
+                    activity_id=activity_id,
+                    user_id=USER_ID,
+                    role_name="DPS",
+                    weapon="Bow",
+                    slot_number=slot,
+                )
+            )
+        async with db.unit_of_work() as session:
+            await session.execute(
+                delete(Registration).where(
+                    Registration.activity_id == activity_id,
+                    Registration.user_id == USER_ID,
+                )
+            )
+
+    async def reload_activity():
+        async with db.unit_of_work() as session:
+            activity = await session.scalar(
+                select(Activity).filter_by(thread_id=THREAD_ID)
+            )
+            registrations = (
+                await session.scalars(
+                    select(Registration).filter_by(activity_id=activity.id)
+                )
+            ).all()
+            messages = (
+                await session.scalars(
+                    select(ActivityMessage).filter_by(activity_id=activity.id)
+                )
+            ).all()
+        ActivityRegistry().put(activity, registrations).set_pages(messages)
+
+    async def deadline_read():
+        async with db.unit_of_work() as session:
+            job = await session.get(ScheduledJob, job_id)
+            activity = await session.get(Activity, job.activity_id)
+            (
+                await session.scalars(
+                    select(Registration.user_id).filter_by(activity_id=activity.id)
+                )
+            ).all()
+
+    return {
+        "join_leave": join_leave,
+        "reload_activity": reload_activity,
+        "deadline_read": deadline_read,
+    }
+
+
+def core_commands(db, activity_id: int, job_id: int, slot: int) -> dict:
+    """Requêtes précompilées de database.queries, lignes sans identité ORM"""
+
+    async def join_leave():
+        async with db.unit_of_work() as session:
+            writes = queries.registration_writes(session)
+            writes.add(activity_id, USER_ID, "DPS", "Bow", slot)
+            await writes.flush(session)
+        async with db.unit_of_work() as session:
+            writes = queries.registration_writes(session)
+            writes.remove(activity_id, USER_ID)
+            await writes.flush(session)
+
+    async def reload_activity():
+        async with db.unit_of_work() as session:
+            await ActivityRegistry().load(session, THREAD_ID)
+
+    async def deadline_read():
+        async with db.unit_of_work() as session:
+            job = (await session.execute(queries.DEADLINE, {"job_id": job_id})).first()
+            (
+                await session.scalars(
+                    queries.REGISTERED_USERS, {"activity_id": job.activity_id}
+                )
+            ).all()
+
+    return {
+        "join_leave": join_leave,
+        "reload_activity": reload_activity,
+        "deadline_read": deadline_read,
+    }
+
+
+async def measure(command, iterations: int) -> float:
+    """Temps CPU du processus (tous threads) par appel, en microsecondes"""
+    for _ in range(min(iterations // 10, 50)):
+        await command()  # Caches de compilation et pool chauds
+    started = time.process_time()
+    for _ in range(iterations):
+        await command()
+    return (time.process_time() - started) / iterations * 1e6
+
+
+async def run_url(url: str, args) -> dict:
+    db = Database(url)
+    await db.create_schema()
+    activity_id, job_id = await seed(db, args.roster)
+    variants = {
+        "orm": orm_commands(db, activity_id, job_id, args.roster + 1),
+        "core": core_commands(db, activity_id, job_id, args.roster + 1),
+    }
+
+    results = {}
+    for name in variants["orm"]:
+        before = await measure(variants["orm"][name], args.iterations)
+        after = await measure(variants["core"][name], args.iterations)
+        results[name] = {
+            "orm_us": round(before, 1),
+            "core_us": round(after, 1),
+            "ratio": round(after / before, 2),
+        }
+        print(
+            f"⏱️ {url.split(':', 1)[0]:<18} {name:<16} "
+            f"{before:>8.1f} µs -> {after:>8.1f} µs  (x{after / before:.2f})"
+        )
+    await db.close()
+    return results
+
+
+async def run(args) -> dict:
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for url in (
+            f"sqlite+aiosqlite:///{directory}/async.db",
+            f"sqlite:///{directory}/sync.db",
+        ):
+            results[url.split(":", 1)[0]] = await run_url(url, args)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--roster", type=int, default=50, help="Inscrits de l'activité")
+    parser.add_argument("--output", help="Écrire les résultats JSON dans ce fichier")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
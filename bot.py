@@ -1,41 +1,167 @@
+import asyncio
+import hashlib
+import json
+import os
+import signal
+import time
+
 import discord
 from discord.ext import commands
 
 from config import Config
 from database.database import Database
+from services.metrics import Metrics, MetricsServer
+from services.watchdog import LoopWatchdog, SamplingProfiler
 
 
 class HorizonBot:
     def __init__(self):
         print("🚀 Initialisation du bot HRZN...")
+        self.phases = {}  # Phase de démarrage -> durée (secondes)
+        self._phase_started = time.perf_counter()
 
         intents = discord.Intents.default()
         intents.message_content = True
         intents.members = True
         intents.guilds = True
 
-        self.bot = commands.Bot(command_prefix="!", intents=intents, help_command=None)
+        # Au-delà de 30 s d'attente, un 429 remonte à la file d'envoi (discord.RateLimited)
+        self.bot = commands.Bot(
+            command_prefix="!",
+            intents=intents,
+            help_command=None,
+            max_ratelimit_timeout=30.0,
+        )
 
         # Attacher la base de données au bot
         self.bot.db = Database()
         self.db = self.bot.db
 
+        # Instrumentation : requêtes SQL, appels REST, latence de la passerelle
+        self.bot.metrics = Metrics()
+        self.metrics = self.bot.metrics
+        self.metrics.instrument_database(self.db)
+        self.metrics.instrument_http(self.bot.http)
+        self.metrics.collector(
+            "hrzn_gateway_latency_seconds",
+            "gauge",
+            "Latence du heartbeat de la passerelle Discord",
+            lambda: self.bot.latency,
+        )
+        self.metrics.collector(
+            "hrzn_startup_phase_seconds",
+            "gauge",
+            "Durée des phases du dernier démarrage",
+            lambda: [
+                ({"phase": phase}, seconds) for phase, seconds in self.phases.items()
+            ],
+        )
+
+        # Diagnostic : blocages de la boucle (opt-in) et profilage à la demande
+        self.bot.profiler = SamplingProfiler(Config.PROFILE_DIR)
+        self.watchdog = None
+        if Config.WATCHDOG_ENABLED:
+            self.watchdog = LoopWatchdog(
+                self.metrics, Config.WATCHDOG_THRESHOLD_MS / 1000
+            )
+
         self.setup_events()
+        self.mark_phase("init")
 
     def setup_events(self):
+        @self.bot.event
+        async def setup_hook():
+            # Une seule fois : après la connexion HTTP, avant la passerelle
+            self.mark_phase("login")
+
+            # Schéma et migrations avant que les cogs ne lisent la base
+            await self.db.create_schema()
+            self.mark_phase("schema")
+
+            # Charger les cogs AVANT de synchroniser
+            await self.load_cogs()
+            self.mark_phase("cogs")
+
+            await self.sync_commands()
+            self.mark_phase("sync")
+
         @self.bot.event
         async def on_ready():
+            # Rappelé à chaque nouvelle session de passerelle : rien à recharger
+            if "gateway" in self.phases:
+                print("🔁 Session de passerelle rétablie")
+                return
+
+            self.mark_phase("gateway")
             print(f"✅ Bot connecté en tant que {self.bot.user}")
             print(f"📊 Connecté à {len(self.bot.guilds)} serveur(s)")
+            print(
+                "⏱️ Démarrage : "
+                + ", ".join(
+                    f"{phase} {seconds * 1000:.0f} ms"
+                    for phase, seconds in self.phases.items()
+                )
+            )
 
-            # Charger les cogs AVANT de synchroniser
-            await self.load_cogs()
+    def mark_phase(self, phase: str):
+        """Clore une phase de démarrage et noter sa durée"""
+        now = time.perf_counter()
+        self.phases[phase] = now - self._phase_started
+        self._phase_started = now
 
-            try:
-                synced = await self.bot.tree.sync()
-                print(f"⚡ {len(synced)} commandes slash synchronisées")
-            except Exception as e:
-                print(f"❌ Erreur de synchronisation: {e}")
+    def command_tree_hash(self, guild=None) -> str:
+        """Empreinte des commandes slash telles qu'envoyées à Discord"""
+        tree = self.bot.tree
+        payload = sorted(
+            (command.to_dict(tree) for command in tree.get_commands(guild=guild)),
+            key=lambda command: (command["name"], command.get("type", 1)),
+        )
+        serialized = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(serialized.encode()).hexdigest()
+
+    def load_sync_state(self) -> dict:
+        try:
+            with open(Config.COMMAND_SYNC_FILE) as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def save_sync_state(self, state: dict):
+        # Écriture atomique : un arrêt brutal ne laisse pas de fichier tronqué
+        temporary = f"{Config.COMMAND_SYNC_FILE}.tmp"
+        with open(temporary, "w") as file:
+            json.dump(state, file, indent=2)
+        os.replace(temporary, Config.COMMAND_SYNC_FILE)
+
+    async def sync_commands(self):
+        """Synchroniser les commandes slash seulement si l'arbre a changé"""
+        guild = None
+        if Config.DEV_GUILD_ID:
+            # Serveur de dev : commandes visibles immédiatement, sans toucher au global
+            guild = discord.Object(id=Config.DEV_GUILD_ID)
+            self.bot.tree.copy_global_to(guild=guild)
+
+        scope = f"{self.bot.application_id}:{guild.id if guild else 'global'}"
+        digest = self.command_tree_hash(guild)
+        state = self.load_sync_state()
+        if state.get(scope) == digest:
+            print("⚡ Commandes slash inchangées : synchronisation ignorée")
+            return
+
+        try:
+            synced = await self.bot.tree.sync(guild=guild)
+        except Exception as e:
+            print(f"❌ Erreur de synchronisation: {e}")
+            return
+
+        # N'enregistrer l'empreinte qu'après un succès
+        state[scope] = digest
+        try:
+            self.save_sync_state(state)
+        except OSError as e:
+            print(f"❌ Empreinte des commandes non enregistrée: {e}")
+        target = f"serveur {guild.id}" if guild else "global"
+        print(f"⚡ {len(synced)} commandes slash synchronisées ({target})")
 
     async def load_cogs(self):
         """Charge uniquement le module Activity"""
@@ -45,9 +171,61 @@ class HorizonBot:
         except Exception as e:
             print(f"❌ Erreur chargement cogs.activity: {e}")
 
+    def is_ready(self) -> bool:
+        """Connecté à la passerelle, module chargé et échéances rattrapées"""
+        cog = self.bot.get_cog("ActivityCog")
+        return (
+            self.bot.is_ready()
+            and cog is not None
+            and cog.startup_task.done()
+            and not cog.startup_task.cancelled()
+            and cog.startup_task.exception() is None
+        )
+
+    async def profile(self, seconds: float):
+        """Profiler la boucle pendant `seconds` (déclenché par SIGUSR1)"""
+        try:
+            path = await self.bot.profiler.run(seconds)
+            print(f"🔬 Profil écrit : {path}")
+        except RuntimeError as e:
+            print(f"❌ {e}")
+
+    def setup_signals(self):
+        # kill -USR1 <pid> : profil de PROFILE_SECONDS secondes (Unix uniquement)
+        if not hasattr(signal, "SIGUSR1"):
+            return
+        try:
+            asyncio.get_running_loop().add_signal_handler(
+                signal.SIGUSR1,
+                lambda: asyncio.create_task(self.profile(Config.PROFILE_SECONDS)),
+            )
+        except (NotImplementedError, RuntimeError):
+            pass
+
     async def start(self):
+        self.setup_signals()
+        if self.watchdog is not None:
+            self.watchdog.start()
+
+        server = None
+        if Config.METRICS_PORT:
+            server = MetricsServer(
+                self.metrics, self.is_ready, Config.METRICS_HOST, Config.METRICS_PORT
+            )
+            try:
+                await server.start()
+            except OSError as e:
+                print(f"❌ Serveur de métriques indisponible: {e}")
+                server = None
+
+        self._phase_started = time.perf_counter()
         try:
             await self.bot.start(Config.DISCORD_TOKEN)
         except KeyboardInterrupt:
             print("\n⏸️  Arrêt du bot...")
             await self.bot.close()
+        finally:
+            if server is not None:
+                await server.stop()
+            if self.watchdog is not None:
+                self.watchdog.stop()
@@ -1,11 +1,32 @@
-from datetime import datetime
+import asyncio
+import time
+import traceback
+from datetime import datetime, timedelta
 
 import discord
 from discord import app_commands
-from discord.ext import commands, tasks
+from discord.ext import commands
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
 
 from config import Config
-from database.models import Activity, Registration
+from database import queries
+from database.archive import archive_batch
+from database.models import (
+    Activity,
+    DmOptOut,
+    Registration,
+    ScheduledJob,
+)
+from services.actor import ActivityActors
+from services.embed_renderer import EmbedRenderer, paginate
+from services.embed_updater import EmbedUpdater
+from services.fanout import FanOut
+from services.outbound import COSMETIC, NORMAL, OutboundQueue
+from services.registry import ActivityRegistry
+from services.scheduler import DeadlineScheduler
+from services.slot_layout import SlotLayout
+from services.watchdog import tag_command
 
 
 class WeaponConfigModal(discord.ui.Modal):
@@ -19,7 +40,7 @@ class WeaponConfigModal(discord.ui.Modal):
         ping_role: discord.Role,
         cog,
         activity_id: int = None,
-        current_config: dict = None,
+        current_layout: SlotLayout = None,
         edit_mode: bool = False,
     ):
         super().__init__(title="⚔️ Configuration des armes")
@@ -32,16 +53,14 @@ class WeaponConfigModal(discord.ui.Modal):
         self.edit_mode = edit_mode
 
         def format_role(role: str):
-            if not current_config:
+            if not current_layout:
                 return None
 
-            role_config = current_config.get(role)
-            if not role_config:
+            weapons = current_layout.weapons(role)
+            if not weapons:
                 return None
 
-            return ", ".join(
-                f"{weapon}:{count}" for weapon, count in role_config.items()
-            )
+            return ", ".join(f"{weapon}:{count}" for weapon, count in weapons)
 
         # Champs de la modal
         self.tank_field = discord.ui.TextInput(
@@ -72,7 +91,8 @@ class WeaponConfigModal(discord.ui.Modal):
         self.add_item(self.healer_field)
         self.add_item(self.dps_field)
 
-    def parse_weapons(self, text: str) -> dict:
+    @staticmethod
+    def parse_weapons(text: str) -> dict:
         """Parser le texte des armes en dictionnaire"""
         result = {}
         try:
@@ -94,6 +114,11 @@ class WeaponConfigModal(discord.ui.Modal):
         return result
 
     async def on_submit(self, interaction: discord.Interaction):
+        interaction.extras["started"] = time.perf_counter()
+        tag_command(
+            "party weapons (modal)" if self.edit_mode else "party create (modal)"
+        )
+        status = "error"
         try:
             # Parser les configurations
             roles_config = {
@@ -110,30 +135,38 @@ class WeaponConfigModal(discord.ui.Modal):
                 )
                 return
 
+            # Compiler la disposition des slots une seule fois
+            layout = SlotLayout.from_config(roles_config)
+
             if self.edit_mode:
                 # Mode édition : mettre à jour l'activité existante
-                await self.update_existing_activity(interaction, roles_config)
+                await self.update_existing_activity(interaction, layout)
             else:
                 # Mode création : créer une nouvelle activité
-                await self.create_new_activity(interaction, roles_config)
+                await self.create_new_activity(interaction, layout)
+            status = "ok"
 
         except ValueError as e:
+            status = "invalid"
             await interaction.response.send_message(
                 f"❌ Erreur de format. Utilisez le format : `NomArme:Nombre` ou `NomArme` (défaut: 1)\n"
                 f"Exemples : `Greataxe:2, Mace` ou `Bow:3, Crossbow:2, Fire Staff`\n\n"
                 f"Détails : {str(e)}",
                 ephemeral=True,
             )
+        finally:
+            name = "party weapons (modal)" if self.edit_mode else "party create (modal)"
+            self.cog.record_command(interaction, name, status)
 
     async def create_new_activity(
-        self, interaction: discord.Interaction, roles_config: dict
+        self, interaction: discord.Interaction, layout: SlotLayout
     ):
         """Créer une nouvelle activité avec la config des armes"""
-        await interaction.response.defer(ephemeral=True)
+        await self.cog.defer(interaction)
 
         # Créer l'embed de l'activité
         embed = self.cog.create_activity_embed(
-            self.activity_title, self.event_datetime, self.leader, roles_config
+            self.activity_title, self.event_datetime, self.leader, layout
         )
 
         # Préparer le contenu du message avec le ping du rôle
@@ -154,132 +187,131 @@ class WeaponConfigModal(discord.ui.Modal):
         )
 
         # Envoyer le message dans le canal
-        message = await interaction.channel.send(content=content, embed=embed)
+        outbound = self.cog.outbound
+        channel = interaction.channel
+        message = await outbound.submit(
+            channel.id, NORMAL, lambda: channel.send(content=content, embed=embed)
+        )
 
         # Créer un thread pour les inscriptions
-        thread = await message.create_thread(
-            name=f"📋 {self.activity_title}", auto_archive_duration=1440
+        thread = await outbound.submit(
+            channel.id,
+            NORMAL,
+            lambda: message.create_thread(
+                name=f"📋 {self.activity_title}", auto_archive_duration=1440
+            ),
         )
 
-        # Sauvegarder dans la base de données
-        session = self.cog.db.get_session()
-        try:
+        # Sauvegarder dans la base de données (connexion libérée avant la réponse)
+        async with self.cog.db.unit_of_work() as session:
             activity = Activity(
-                message_id=str(message.id),
-                thread_id=str(thread.id),
-                channel_id=str(interaction.channel.id),
-                guild_id=str(interaction.guild.id),
+                message_id=message.id,
+                thread_id=thread.id,
+                channel_id=interaction.channel.id,
+                guild_id=interaction.guild.id,
                 title=self.activity_title,
-                leader=str(self.leader.id),
+                leader=self.leader.id,
                 event_date=self.event_datetime,
-                ping_role_id=str(self.ping_role.id),
-                roles_config=roles_config,
-                reminders=[30],  # Un seul rappel à 30 minutes
+                ping_role_id=self.ping_role.id,
+                roles_config=layout.to_config(),
+                reminders=Config.DEFAULT_REMINDER_MINUTES,
                 last_reminder_sent=None,  # Nouveau champ pour tracker le dernier rappel
             )
             session.add(activity)
-            session.commit()
 
-            # Compter le nombre total de slots
-            total_slots = sum(
-                sum(weapons.values()) for weapons in roles_config.values()
-            )
+            # Planifier les rappels et le démarrage
+            jobs = await self.cog.plan_activity_jobs(session, activity)
 
-            # Formater le rôle pour le message de confirmation
-            if self.ping_role.name in ["@everyone", "@here"]:
-                role_display = self.ping_role.name
-            else:
-                role_display = self.ping_role.mention
+        self.cog.schedule_jobs(jobs)
+        self.cog.registry.put(activity, [])
 
-            await interaction.followup.send(
-                f"✅ Activité **{self.activity_title}** créée avec succès !\n"
-                f"👑 Leader : {self.leader.mention}\n"
-                f"📢 Rôle à ping : {role_display}\n"
-                f"🎯 Slots disponibles : **{total_slots}**\n"
-                f"💬 Thread d'inscription : {thread.mention}\n\n"
-                f"*Les joueurs peuvent s'inscrire avec `/party join <slot>` dans le thread.*",
-                ephemeral=True,
-            )
+        # L'embed envoyé sert de référence pour ignorer les éditions sans effet
+        self.cog.renderer.mark_sent(
+            activity.id, message.id, self.cog.renderer.digest(embed)
+        )
 
-        finally:
-            session.close()
+        # Grand roster : les pages de suite sont publiées par le prochain rendu
+        if len(paginate(layout)) > 1:
+            self.cog.embed_updater.mark_dirty(activity.id)
+
+        # Compter le nombre total de slots
+        total_slots = layout.total
+
+        # Formater le rôle pour le message de confirmation
+        if self.ping_role.name in ["@everyone", "@here"]:
+            role_display = self.ping_role.name
+        else:
+            role_display = self.ping_role.mention
+
+        await interaction.followup.send(
+            f"✅ Activité **{self.activity_title}** créée avec succès !\n"
+            f"👑 Leader : {self.leader.mention}\n"
+            f"📢 Rôle à ping : {role_display}\n"
+            f"🎯 Slots disponibles : **{total_slots}**\n"
+            f"💬 Thread d'inscription : {thread.mention}\n\n"
+            f"*Les joueurs peuvent s'inscrire avec `/party join <slot>` dans le thread.*",
+            ephemeral=True,
+        )
 
     async def update_existing_activity(
-        self, interaction: discord.Interaction, roles_config: dict
+        self, interaction: discord.Interaction, layout: SlotLayout
     ):
         """Mettre à jour la configuration des armes d'une activité existante"""
-        await interaction.response.defer(ephemeral=True)
+        await self.cog.defer(interaction)
 
-        session = self.cog.db.get_session()
-        try:
-            # Récupérer l'activité
-            activity = session.query(Activity).filter_by(id=self.activity_id).first()
+        state = self.cog.registry.get(self.activity_id)
+        if not state:
+            await interaction.followup.send("❌ Activité introuvable.", ephemeral=True)
+            return
 
-            if not activity:
-                await interaction.followup.send(
-                    "❌ Activité introuvable.", ephemeral=True
-                )
-                return
+        ok, deleted = await self.cog.submit(
+            interaction, state, self.rebalance_registrations, layout
+        )
+        if not ok:
+            return
 
-            # CORRECTION: Recalculer les inscriptions basées sur rôle/arme plutôt que sur slot_number
-            registrations = (
-                session.query(Registration).filter_by(activity_id=activity.id).all()
-            )
+        message = f"✅ Configuration des armes mise à jour !\n🎯 Nouveaux slots : **{layout.total}**\n"
+
+        if deleted:
+            message += f"⚠️ {deleted} inscription(s) supprimée(s) (plus de slots disponibles pour ce rôle/arme)"
 
-            # Créer un mapping des inscriptions actuelles par (role, weapon, index)
-            current_mapping = {}
-            for reg in registrations:
-                key = (reg.role_name, reg.weapon)
-                if key not in current_mapping:
-                    current_mapping[key] = []
-                current_mapping[key].append(reg)
-
-            # Calculer les nouveaux slots et réassigner
-            new_slot = 1
-            registrations_to_keep = []
-            registrations_to_delete = []
-
-            for role_name, weapons in roles_config.items():
-                for weapon, count in weapons.items():
-                    key = (role_name, weapon)
-                    existing_regs = current_mapping.get(key, [])
-
-                    # Garder seulement le nombre de slots disponibles
-                    for i in range(count):
-                        if i < len(existing_regs):
-                            # Réassigner le slot_number
-                            existing_regs[i].slot_number = new_slot
-                            registrations_to_keep.append(existing_regs[i])
-                        new_slot += 1
-
-                    # Marquer les inscriptions en trop pour suppression
-                    if len(existing_regs) > count:
-                        registrations_to_delete.extend(existing_regs[count:])
-
-            # Supprimer les inscriptions qui n'ont plus de place
-            for reg in registrations_to_delete:
-                session.delete(reg)
-
-            # Mettre à jour la configuration
-            activity.roles_config = roles_config
-            session.commit()
-
-            # Mettre à jour l'embed
-            await self.cog.update_activity_embed(activity, session)
-
-            new_total_slots = sum(
-                sum(weapons.values()) for weapons in roles_config.values()
+        await interaction.followup.send(message, ephemeral=True)
+
+    async def rebalance_registrations(self, session, state, layout: SlotLayout):
+        """Commande : réassigner les inscriptions à la nouvelle disposition"""
+        # Retourne le nombre d'inscriptions supprimées faute de place
+        await queries.registration_writes(session).flush(session)
+        activity = await session.get(Activity, state.id)
+
+        # CORRECTION: Recalculer les inscriptions basées sur rôle/arme plutôt que sur slot_number
+        registrations = (
+            await session.scalars(
+                select(Registration).filter_by(activity_id=activity.id)
             )
+        ).all()
 
-            message = f"✅ Configuration des armes mise à jour !\n🎯 Nouveaux slots : **{new_total_slots}**\n"
+        # Réassigner les slots bloc par bloc (rôle, arme) de la nouvelle disposition
+        registrations_to_keep, new_slots, registrations_to_delete = layout.reassign(
+            registrations
+        )
 
-            if registrations_to_delete:
-                message += f"⚠️ {len(registrations_to_delete)} inscription(s) supprimée(s) (plus de slots disponibles pour ce rôle/arme)"
+        # Supprimer les inscriptions qui n'ont plus de place
+        for reg in registrations_to_delete:
+            await session.delete(reg)
 
-            await interaction.followup.send(message, ephemeral=True)
+        # Passer par des numéros négatifs : une permutation de slots ne doit
+        # jamais violer l'unicité (activité, slot) au milieu du flush
+        for reg in registrations_to_keep:
+            reg.slot_number = -reg.slot_number
+        await session.flush()
 
-        finally:
-            session.close()
+        for reg, slot in zip(registrations_to_keep, new_slots):
+            reg.slot_number = slot
+
+        # Mettre à jour la configuration
+        activity.roles_config = layout.to_config()
+        self.cog.registry.put(activity, registrations_to_keep)
+        return len(registrations_to_delete)
 
 
 class PartyGroup(app_commands.Group):
@@ -290,13 +322,153 @@ class PartyGroup(app_commands.Group):
 
 
 class ActivityCog(commands.Cog):
+    FETCH_RETRIES = 3
+
     def __init__(self, bot):
         self.bot = bot
         self.db = bot.db
-        self.check_reminders.start()
+        self.scheduler = DeadlineScheduler(self.on_deadline)
+        self.embed_updater = EmbedUpdater(
+            self.flush_activity_embed, Config.EMBED_UPDATE_WINDOW_SECONDS
+        )
+        self.horizon_end = None  # Fin de la fenêtre d'échéances chargée en mémoire
+        self.horizon_failures = 0  # Échecs consécutifs du rechargement de la fenêtre
+        self.job_failures = (
+            {}
+        )  # job_id -> démarrages reportés faute de thread joignable
+        self.channels = {}  # Cache channel_id -> salon/thread résolu
+        self.registry = ActivityRegistry()
+        self.renderer = EmbedRenderer(Config.COLOR_PRIMARY)
+        self.actors = ActivityActors(self.apply_batch, Config.ACTOR_IDLE_SECONDS)
+        self.outbound = OutboundQueue(Config.OUTBOUND_CONCURRENCY)
+        self.fanout = FanOut(
+            bot,
+            self.outbound,
+            Config.FANOUT_CONCURRENCY,
+            Config.DM_REMINDERS,
+            Config.DM_CONCURRENCY,
+        )
+
+    async def cog_load(self):
+        self.outbound.start()
+
+        # Charger les activités actives en mémoire
+        async with self.db.unit_of_work() as session:
+            await self.registry.hydrate(session)
+            self.fanout.opt_outs = set(await session.scalars(select(DmOptOut.user_id)))
+        print(f"🗂️ {len(self.registry)} activité(s) chargée(s) en mémoire")
+
+        # Le rattrapage envoie des messages : il attend que le bot soit prêt
+        self.startup_task = asyncio.create_task(self.start_scheduler())
+        self.register_metrics()
+
+    async def cog_unload(self):
+        self.startup_task.cancel()
+        self.scheduler.stop()
+        await self.actors.close()
+        await self.embed_updater.flush_all()
+        await self.outbound.stop()
+
+    def register_metrics(self):
+        """Exposer l'état des files et du registre à chaque lecture des métriques"""
+        metrics = self.bot.metrics
+        metrics.collector(
+            "hrzn_outbound_queue_depth",
+            "gauge",
+            "Envois Discord en attente, par priorité",
+            lambda: [
+                ({"priority": priority}, depth)
+                for priority, depth in self.outbound.depth().items()
+            ],
+        )
+        metrics.collector(
+            "hrzn_outbound_jobs_total",
+            "counter",
+            "Envois de la file sortante, par issue",
+            lambda: [
+                ({"result": result}, self.outbound.metrics[result])
+                for result in ("sent", "failed", "rate_limited", "coalesced")
+            ],
+        )
+        metrics.collector(
+            "hrzn_outbound_wait_seconds",
+            "gauge",
+            "Attente en file des envois Discord (moyenne et maximum)",
+            lambda: [
+                ({"stat": "avg"}, self.outbound.snapshot()["wait_avg"]),
+                ({"stat": "max"}, self.outbound.metrics["wait_max"]),
+            ],
+        )
+        metrics.collector(
+            "hrzn_fanout_last_seconds",
+            "gauge",
+            "Durée de la dernière diffusion de rappel",
+            lambda: self.fanout.timings[-1][1] if self.fanout.timings else 0.0,
+        )
+        metrics.collector(
+            "hrzn_active_activities",
+            "gauge",
+            "Activités actives en mémoire",
+            lambda: len(self.registry),
+        )
+        metrics.collector(
+            "hrzn_scheduled_deadlines",
+            "gauge",
+            "Échéances planifiées en mémoire",
+            lambda: len(self.scheduler),
+        )
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        # Point de départ de la mesure de latence des commandes
+        interaction.extras["started"] = time.perf_counter()
+        if interaction.command is not None:
+            tag_command(interaction.command.qualified_name)
+        return True
+
+    async def defer(self, interaction: discord.Interaction):
+        """Accuser réception (éphémère) en notant le délai de l'accusé"""
+        await interaction.response.defer(ephemeral=True)
+        interaction.extras["deferred"] = time.perf_counter()
+
+    def record_command(self, interaction: discord.Interaction, name: str, status: str):
+        """Enregistrer la latence d'une commande : defer, followup et total"""
+        started = interaction.extras.get("started")
+        if started is None:
+            return
+        now = time.perf_counter()
+        metrics = self.bot.metrics
+        deferred = interaction.extras.get("deferred")
+        if deferred is not None:
+            metrics.observe(
+                "hrzn_command_seconds", deferred - started, command=name, phase="defer"
+            )
+            metrics.observe(
+                "hrzn_command_seconds", now - deferred, command=name, phase="followup"
+            )
+        metrics.observe(
+            "hrzn_command_seconds", now - started, command=name, phase="total"
+        )
+        metrics.inc("hrzn_commands_total", command=name, status=status)
+
+    @commands.Cog.listener()
+    async def on_app_command_completion(self, interaction, command):
+        if command.binding is self:
+            self.record_command(interaction, command.qualified_name, "ok")
+
+    async def cog_app_command_error(self, interaction, error):
+        command = interaction.command
+        name = command.qualified_name if command else "?"
+        if isinstance(error, app_commands.MissingPermissions):
+            self.record_command(interaction, name, "denied")
+            await interaction.response.send_message(
+                "❌ Cette commande est réservée aux administrateurs.", ephemeral=True
+            )
+            return
 
-    def cog_unload(self):
-        self.check_reminders.cancel()
+        self.record_command(interaction, name, "error")
+        # Définir ce gestionnaire fait taire celui de l'arbre : journaliser ici
+        print(f"❌ Erreur dans /{name}: {error}")
+        traceback.print_exception(type(error), error, error.__traceback__)
 
     # Groupe de commandes /party
     party = PartyGroup()
@@ -372,88 +544,82 @@ class ActivityCog(commands.Cog):
             )
             return
 
-        session = self.db.get_session()
-        try:
-            # Récupérer l'activité
-            activity = (
-                session.query(Activity)
-                .filter_by(thread_id=str(interaction.channel.id))
-                .first()
-            )
+        # Récupérer l'activité (en mémoire)
+        state = await self.get_thread_state(interaction.channel.id)
 
-            if not activity:
-                await interaction.response.send_message(
-                    "❌ Aucune activité trouvée pour ce thread.", ephemeral=True
-                )
-                return
-
-            await interaction.response.defer(ephemeral=True)
-
-            # Vérifier si au moins un paramètre a été fourni
-            if not any([title, date, time, leader, ping_role]):
-                await interaction.followup.send(
-                    "❌ Veuillez spécifier au moins un paramètre à modifier.",
-                    ephemeral=True,
-                )
-                return
+        if not state:
+            await interaction.response.send_message(
+                "❌ Aucune activité trouvée pour ce thread.", ephemeral=True
+            )
+            return
 
-            # Mettre à jour les champs
-            changes = []
+        await self.defer(interaction)
 
-            if title:
-                activity.title = title
-                changes.append(f"Titre : **{title}**")
+        # Vérifier si au moins un paramètre a été fourni
+        if not any([title, date, time, leader, ping_role]):
+            await interaction.followup.send(
+                "❌ Veuillez spécifier au moins un paramètre à modifier.",
+                ephemeral=True,
+            )
+            return
 
-            if date or time:
-                try:
-                    current_date = activity.event_date.strftime("%d/%m/%Y")
-                    current_time = activity.event_date.strftime("%H:%M")
+        # Préparer les champs à mettre à jour
+        fields = {}
+        changes = []
 
-                    new_date = date if date else current_date
-                    new_time = time if time else current_time
+        if title:
+            fields["title"] = title
+            changes.append(f"Titre : **{title}**")
 
-                    event_datetime = datetime.strptime(
-                        f"{new_date} {new_time}", "%d/%m/%Y %H:%M"
-                    )
+        if date or time:
+            try:
+                current_date = state.event_date.strftime("%d/%m/%Y")
+                current_time = state.event_date.strftime("%H:%M")
 
-                    if event_datetime <= datetime.now():
-                        await interaction.followup.send(
-                            "❌ La nouvelle date doit être dans le futur.",
-                            ephemeral=True,
-                        )
-                        return
+                new_date = date if date else current_date
+                new_time = time if time else current_time
 
-                    activity.event_date = event_datetime
-                    # Réinitialiser le tracker de rappel si la date change
-                    activity.last_reminder_sent = None
-                    changes.append(f"Date/Heure : **{new_date} à {new_time}**")
+                event_datetime = datetime.strptime(
+                    f"{new_date} {new_time}", "%d/%m/%Y %H:%M"
+                )
 
-                except ValueError:
+                if event_datetime <= datetime.now():
                     await interaction.followup.send(
-                        "❌ Format de date/heure invalide.", ephemeral=True
+                        "❌ La nouvelle date doit être dans le futur.",
+                        ephemeral=True,
                     )
                     return
 
-            if leader:
-                activity.leader = str(leader.id)
-                changes.append(f"Leader : {leader.mention}")
+                fields["event_date"] = event_datetime
+                changes.append(f"Date/Heure : **{new_date} à {new_time}**")
 
-            if ping_role:
-                activity.ping_role_id = str(ping_role.id)
-                changes.append(f"Rôle à ping : {ping_role.mention}")
+            except ValueError:
+                await interaction.followup.send(
+                    "❌ Format de date/heure invalide.", ephemeral=True
+                )
+                return
 
-            session.commit()
+        if leader:
+            fields["leader"] = leader.id
+            changes.append(f"Leader : {leader.mention}")
 
-            # CORRECTION: Mettre à jour l'embed avec les nouvelles informations
-            await self.update_activity_embed_full(activity, session)
+        if ping_role:
+            fields["ping_role_id"] = ping_role.id
+            changes.append(f"Rôle à ping : {ping_role.mention}")
 
-            await interaction.followup.send(
-                "✅ Activité mise à jour :\n" + "\n".join(f"• {c}" for c in changes),
-                ephemeral=True,
-            )
+        ok, jobs = await self.submit(interaction, state, self.edit_activity, fields)
+        if not ok:
+            return
 
-        finally:
-            session.close()
+        # Re-planifier les rappels si la date a changé
+        if jobs is not None:
+            self.scheduler.cancel_group(state.id)
+            self.schedule_jobs(jobs)
+
+        await interaction.followup.send(
+            "✅ Activité mise à jour :\n" + "\n".join(f"• {c}" for c in changes),
+            ephemeral=True,
+        )
 
     @party.command(name="weapons", description="Modifier la configuration des armes")
     async def party_weapons(self, interaction: discord.Interaction):
@@ -465,40 +631,31 @@ class ActivityCog(commands.Cog):
             )
             return
 
-        session = self.db.get_session()
-        try:
-            # Récupérer l'activité
-            activity = (
-                session.query(Activity)
-                .filter_by(thread_id=str(interaction.channel.id))
-                .first()
-            )
+        # Récupérer l'activité (en mémoire)
+        state = await self.get_thread_state(interaction.channel.id)
 
-            if not activity:
-                await interaction.response.send_message(
-                    "❌ Aucune activité trouvée pour ce thread.", ephemeral=True
-                )
-                return
-
-            # Afficher la modal avec la configuration actuelle
-            modal = WeaponConfigModal(
-                title=activity.title,
-                event_datetime=activity.event_date,
-                leader=None,  # On garde le leader actuel
-                ping_role=None,  # On garde le rôle actuel
-                cog=self,
-                activity_id=activity.id,
-                current_config=activity.roles_config,
-                edit_mode=True,
+        if not state:
+            await interaction.response.send_message(
+                "❌ Aucune activité trouvée pour ce thread.", ephemeral=True
             )
-            await interaction.response.send_modal(modal)
+            return
 
-        finally:
-            session.close()
+        # Afficher la modal avec la configuration actuelle
+        modal = WeaponConfigModal(
+            title=state.title,
+            event_datetime=state.event_date,
+            leader=None,  # On garde le leader actuel
+            ping_role=None,  # On garde le rôle actuel
+            cog=self,
+            activity_id=state.id,
+            current_layout=state.layout,
+            edit_mode=True,
+        )
+        await interaction.response.send_modal(modal)
 
     @party.command(name="delete", description="Supprimer une activité")
     async def party_delete(self, interaction: discord.Interaction):
-        await interaction.response.defer(ephemeral=True)
+        await self.defer(interaction)
 
         # Vérifier qu'on est dans un thread d'activité
         if not isinstance(interaction.channel, discord.Thread):
@@ -508,57 +665,44 @@ class ActivityCog(commands.Cog):
             )
             return
 
-        session = self.db.get_session()
-        try:
-            # Récupérer l'activité
-            activity = (
-                session.query(Activity)
-                .filter_by(thread_id=str(interaction.channel.id))
-                .first()
-            )
-
-            if not activity:
-                await interaction.followup.send(
-                    "❌ Aucune activité trouvée pour ce thread.", ephemeral=True
-                )
-                return
-
-            # Récupérer les informations avant suppression
-            activity_title = activity.title
-            message_id = int(activity.message_id)
-            channel_id = int(activity.channel_id)
-
-            # Supprimer de la base de données
-            session.delete(activity)
-            session.commit()
-
-            # Supprimer le message d'activité
-            try:
-                channel = self.bot.get_channel(channel_id)
-                if channel:
-                    message = await channel.fetch_message(message_id)
-                    await message.delete()
-            except:
-                pass
+        # Récupérer l'activité (en mémoire)
+        state = await self.get_thread_state(interaction.channel.id)
 
+        if not state:
             await interaction.followup.send(
-                f"✅ L'activité **{activity_title}** a été supprimée.",
-                ephemeral=True,
+                "❌ Aucune activité trouvée pour ce thread.", ephemeral=True
             )
+            return
 
-            # Archiver le thread
-            try:
-                await interaction.channel.edit(archived=True)
-            except:
-                pass
+        # Supprimer de la base de données et annuler ses échéances
+        ok, _ = await self.submit(interaction, state, self.delete_activity)
+        if not ok:
+            return
+        self.scheduler.cancel_group(state.id)
+        self.embed_updater.forget(state.id)
+        self.renderer.forget(state.id)
+
+        # Supprimer les messages d'activité (première page et suites)
+        channel = await self.resolve_channel(state.channel_id)
+        for message_id in state.pages if channel else ():
+            self.outbound.submit(
+                channel.id, NORMAL, channel.get_partial_message(message_id).delete
+            )
+        self.channels.pop(interaction.channel.id, None)
 
-        finally:
-            session.close()
+        await interaction.followup.send(
+            f"✅ L'activité **{state.title}** a été supprimée.",
+            ephemeral=True,
+        )
+
+        # Archiver le thread
+        thread = interaction.channel
+        self.outbound.submit(thread.id, NORMAL, lambda: thread.edit(archived=True))
 
     @party.command(name="join", description="Rejoindre un slot d'activité")
     @app_commands.describe(slot="Numéro du slot à rejoindre")
     async def party_join(self, interaction: discord.Interaction, slot: int):
-        await interaction.response.defer(ephemeral=True)
+        await self.defer(interaction)
 
         # Vérifier qu'on est dans un thread d'activité
         if not isinstance(interaction.channel, discord.Thread):
@@ -568,95 +712,55 @@ class ActivityCog(commands.Cog):
             )
             return
 
-        session = self.db.get_session()
-        try:
-            # Récupérer l'activité
-            activity = (
-                session.query(Activity)
-                .filter_by(thread_id=str(interaction.channel.id))
-                .first()
-            )
-
-            if not activity:
-                await interaction.followup.send(
-                    "❌ Aucune activité trouvée pour ce thread.", ephemeral=True
-                )
-                return
+        # Récupérer l'activité (en mémoire)
+        state = await self.get_thread_state(interaction.channel.id)
 
-            # Vérifier que l'utilisateur n'est pas déjà inscrit
-            existing_registration = (
-                session.query(Registration)
-                .filter_by(activity_id=activity.id, user_id=str(interaction.user.id))
-                .first()
+        if not state:
+            await interaction.followup.send(
+                "❌ Aucune activité trouvée pour ce thread.", ephemeral=True
             )
+            return
 
-            if existing_registration:
-                await interaction.followup.send(
-                    f"❌ Vous êtes déjà inscrit sur le slot {existing_registration.slot_number}.\n"
-                    f"Utilisez `/party leave` pour vous désinscrire d'abord.",
-                    ephemeral=True,
-                )
-                return
-
-            # Trouver le rôle et l'arme correspondants au slot
-            current_slot = 1
-            target_role = None
-            target_weapon = None
-
-            for role_name, weapons in activity.roles_config.items():
-                for weapon, count in weapons.items():
-                    if current_slot <= slot < current_slot + count:
-                        target_role = role_name
-                        target_weapon = weapon
-                        break
-                    current_slot += count
-                if target_role:
-                    break
-
-            if not target_role:
-                await interaction.followup.send(
-                    f"❌ Le slot {slot} n'existe pas.", ephemeral=True
-                )
-                return
+        # Créer l'inscription
+        user_id = interaction.user.id
+        ok, result = await self.submit_claim(interaction, state, slot, user_id)
+        if not ok:
+            return
+        error, placement = result
 
-            # Vérifier que le slot n'est pas déjà pris
-            existing_slot = (
-                session.query(Registration)
-                .filter_by(activity_id=activity.id, slot_number=slot)
-                .first()
+        # Vérifier que l'utilisateur n'est pas déjà inscrit
+        if error == "user":
+            current = placement[0] if placement else state.user_to_slot.get(user_id)
+            await interaction.followup.send(
+                f"❌ Vous êtes déjà inscrit sur le slot {current}.\n"
+                f"Utilisez `/party leave` pour vous désinscrire d'abord.",
+                ephemeral=True,
             )
+            return
 
-            if existing_slot:
-                await interaction.followup.send(
-                    f"❌ Le slot {slot} est déjà pris.", ephemeral=True
-                )
-                return
-
-            # Créer l'inscription
-            registration = Registration(
-                activity_id=activity.id,
-                user_id=str(interaction.user.id),
-                role_name=target_role,
-                weapon=target_weapon,
-                slot_number=slot,
+        # Vérifier que le slot existe
+        if error == "missing":
+            await interaction.followup.send(
+                f"❌ Le slot {slot} n'existe pas.", ephemeral=True
             )
-            session.add(registration)
-            session.commit()
-
-            # Mettre à jour l'embed
-            await self.update_activity_embed(activity, session)
+            return
 
+        # Vérifier que le slot n'est pas déjà pris
+        if error == "slot":
             await interaction.followup.send(
-                f"✅ Vous êtes inscrit sur le slot **{slot}** ({target_role} - {target_weapon}) !",
-                ephemeral=True,
+                f"❌ Le slot {slot} est déjà pris.", ephemeral=True
             )
+            return
 
-        finally:
-            session.close()
+        slot, target_role, target_weapon = placement
+        await interaction.followup.send(
+            f"✅ Vous êtes inscrit sur le slot **{slot}** ({target_role} - {target_weapon}) !",
+            ephemeral=True,
+        )
 
     @party.command(name="leave", description="Quitter un slot d'activité")
     async def party_leave(self, interaction: discord.Interaction):
-        await interaction.response.defer(ephemeral=True)
+        await self.defer(interaction)
 
         # Vérifier qu'on est dans un thread d'activité
         if not isinstance(interaction.channel, discord.Thread):
@@ -666,61 +770,44 @@ class ActivityCog(commands.Cog):
             )
             return
 
-        session = self.db.get_session()
-        try:
-            # Récupérer l'activité
-            activity = (
-                session.query(Activity)
-                .filter_by(thread_id=str(interaction.channel.id))
-                .first()
-            )
+        # Récupérer l'activité (en mémoire)
+        state = await self.get_thread_state(interaction.channel.id)
 
-            if not activity:
-                await interaction.followup.send(
-                    "❌ Aucune activité trouvée pour ce thread.", ephemeral=True
-                )
-                return
-
-            # Vérifier que l'utilisateur est inscrit
-            registration = (
-                session.query(Registration)
-                .filter_by(activity_id=activity.id, user_id=str(interaction.user.id))
-                .first()
+        if not state:
+            await interaction.followup.send(
+                "❌ Aucune activité trouvée pour ce thread.", ephemeral=True
             )
+            return
 
-            if not registration:
-                await interaction.followup.send(
-                    "❌ Vous n'êtes pas inscrit à cette activité.", ephemeral=True
-                )
-                return
-
-            # Sauvegarder les infos avant suppression
-            slot_number = registration.slot_number
-            role_name = registration.role_name
-            weapon = registration.weapon
-
-            # Supprimer l'inscription
-            session.delete(registration)
-            session.commit()
-
-            # Mettre à jour l'embed
-            await self.update_activity_embed(activity, session)
+        # Supprimer l'inscription
+        ok, released = await self.submit(
+            interaction, state, self.release_slot, interaction.user.id
+        )
+        if not ok:
+            return
 
+        # Vérifier que l'utilisateur était inscrit
+        if released is None:
             await interaction.followup.send(
-                f"✅ Vous avez quitté le slot **{slot_number}** ({role_name} - {weapon}).",
-                ephemeral=True,
+                "❌ Vous n'êtes pas inscrit à cette activité.", ephemeral=True
             )
+            return
 
-        finally:
-            session.close()
+        slot_number, role_name, weapon = released
+
+        await interaction.followup.send(
+            f"✅ Vous avez quitté le slot **{slot_number}** ({role_name} - {weapon}).",
+            ephemeral=True,
+        )
 
     @party.command(name="add", description="Ajouter un joueur à un slot (admin/leader)")
     @app_commands.describe(user="Joueur à ajouter", slot="Numéro du slot")
     async def party_add(
         self, interaction: discord.Interaction, user: discord.Member, slot: int
     ):
-        await interaction.response.defer(ephemeral=True)
+        await self.defer(interaction)
 
+        # Vérifier qu'on est dans un thread d'activité
         if not isinstance(interaction.channel, discord.Thread):
             await interaction.followup.send(
                 "❌ Cette commande doit être utilisée dans le thread d'une activité.",
@@ -728,98 +815,74 @@ class ActivityCog(commands.Cog):
             )
             return
 
-        session = self.db.get_session()
-        try:
-            activity = (
-                session.query(Activity)
-                .filter_by(thread_id=str(interaction.channel.id))
-                .first()
-            )
+        # Récupérer l'activité (en mémoire)
+        state = await self.get_thread_state(interaction.channel.id)
 
-            if not activity:
-                await interaction.followup.send(
-                    "❌ Aucune activité trouvée pour ce thread.",
-                    ephemeral=True,
-                )
-                return
-
-            # Vérifier que l'utilisateur n'est pas déjà inscrit
-            existing_registration = (
-                session.query(Registration)
-                .filter_by(activity_id=activity.id, user_id=str(user.id))
-                .first()
+        if not state:
+            await interaction.followup.send(
+                "❌ Aucune activité trouvée pour ce thread.", ephemeral=True
             )
+            return
 
-            if existing_registration:
-                await interaction.followup.send(
-                    f"❌ {user.mention} est déjà inscrit sur le slot {existing_registration.slot_number}.",
-                    ephemeral=True,
-                )
-                return
-
-            # Trouver le rôle et l'arme correspondants au slot
-            current_slot = 1
-            target_role = None
-            target_weapon = None
-
-            for role_name, weapons in activity.roles_config.items():
-                for weapon, count in weapons.items():
-                    if current_slot <= slot < current_slot + count:
-                        target_role = role_name
-                        target_weapon = weapon
-                        break
-                    current_slot += count
-                if target_role:
-                    break
-
-            if not target_role:
-                await interaction.followup.send(
-                    f"❌ Le slot {slot} n'existe pas.", ephemeral=True
-                )
-                return
+        # Créer l'inscription
+        ok, result = await self.submit_claim(interaction, state, slot, user.id)
+        if not ok:
+            return
+        error, placement = result
 
-            # Vérifier que le slot n'est pas déjà pris
-            existing_slot = (
-                session.query(Registration)
-                .filter_by(activity_id=activity.id, slot_number=slot)
-                .first()
+        # Vérifier que l'utilisateur n'est pas déjà inscrit
+        if error == "user":
+            current = placement[0] if placement else state.user_to_slot.get(user.id)
+            await interaction.followup.send(
+                f"❌ {user.mention} est déjà inscrit sur le slot {current}.",
+                ephemeral=True,
             )
+            return
 
-            if existing_slot:
-                await interaction.followup.send(
-                    f"❌ Le slot {slot} est déjà pris.", ephemeral=True
-                )
-                return
-
-            # Créer l'inscription
-            registration = Registration(
-                activity_id=activity.id,
-                user_id=str(user.id),
-                role_name=target_role,
-                weapon=target_weapon,
-                slot_number=slot,
+        # Vérifier que le slot existe
+        if error == "missing":
+            await interaction.followup.send(
+                f"❌ Le slot {slot} n'existe pas.", ephemeral=True
             )
-            session.add(registration)
-            session.commit()
-
-            # Mettre à jour l'embed
-            await self.update_activity_embed(activity, session)
+            return
 
+        # Vérifier que le slot n'est pas déjà pris
+        if error == "slot":
             await interaction.followup.send(
-                f"✅ {user.mention} a été ajouté au slot **{slot}** ({target_role} - {target_weapon}).",
-                ephemeral=True,
+                f"❌ Le slot {slot} est déjà pris.", ephemeral=True
             )
+            return
 
-        finally:
-            session.close()
+        slot, target_role, target_weapon = placement
+        await interaction.followup.send(
+            f"✅ {user.mention} a été ajouté au slot **{slot}** ({target_role} - {target_weapon}).",
+            ephemeral=True,
+        )
+
+    @party_join.autocomplete("slot")
+    @party_add.autocomplete("slot")
+    async def slot_autocomplete(self, interaction: discord.Interaction, current):
+        """Proposer les slots libres du thread (index en mémoire, sans requête)"""
+        # Délai de 3 s côté Discord : une activité absente du registre n'est pas chargée
+        state = self.registry.get_by_thread(interaction.channel_id)
+        if state is None:
+            return []
+
+        return [
+            app_commands.Choice(
+                name=f"{slot}. {role_name} - {weapon}"[:100], value=slot
+            )
+            for slot, role_name, weapon in state.free_slots(str(current or ""))
+        ]
 
     @party.command(
         name="reset", description="Retirer un joueur d'un slot (admin/leader)"
     )
     @app_commands.describe(user="Joueur à retirer de l'activité")
     async def party_reset(self, interaction: discord.Interaction, user: discord.Member):
-        await interaction.response.defer(ephemeral=True)
+        await self.defer(interaction)
 
+        # Vérifier qu'on est dans un thread d'activité
         if not isinstance(interaction.channel, discord.Thread):
             await interaction.followup.send(
                 "❌ Cette commande doit être utilisée dans le thread d'une activité.",
@@ -827,99 +890,253 @@ class ActivityCog(commands.Cog):
             )
             return
 
-        session = self.db.get_session()
-        try:
-            activity = (
-                session.query(Activity)
-                .filter_by(thread_id=str(interaction.channel.id))
-                .first()
-            )
-
-            if not activity:
-                await interaction.followup.send(
-                    "❌ Aucune activité trouvée pour ce thread.",
-                    ephemeral=True,
-                )
-                return
+        # Récupérer l'activité (en mémoire)
+        state = await self.get_thread_state(interaction.channel.id)
 
-            registration = (
-                session.query(Registration)
-                .filter_by(activity_id=activity.id, user_id=str(user.id))
-                .first()
+        if not state:
+            await interaction.followup.send(
+                "❌ Aucune activité trouvée pour ce thread.", ephemeral=True
             )
+            return
 
-            if not registration:
-                await interaction.followup.send(
-                    f"❌ {user.mention} n'est pas inscrit à cette activité.",
-                    ephemeral=True,
-                )
-                return
-
-            slot = registration.slot_number
-            role = registration.role_name
-            weapon = registration.weapon
-
-            session.delete(registration)
-            session.commit()
-
-            await self.update_activity_embed(activity, session)
+        ok, released = await self.submit(interaction, state, self.release_slot, user.id)
+        if not ok:
+            return
 
+        if released is None:
             await interaction.followup.send(
-                f"✅ {user.mention} a été retiré du slot **{slot}** ({role} - {weapon}).",
+                f"❌ {user.mention} n'est pas inscrit à cette activité.",
                 ephemeral=True,
             )
+            return
 
-        finally:
-            session.close()
+        slot, role, weapon = released
 
-    def create_activity_embed(self, title, event_date, leader, roles_config):
-        """Créer l'embed d'affichage de l'activité"""
-        embed = discord.Embed(title=title, color=Config.COLOR_PRIMARY)
+        await interaction.followup.send(
+            f"✅ {user.mention} a été retiré du slot **{slot}** ({role} - {weapon}).",
+            ephemeral=True,
+        )
 
-        if leader is None:
-            leader_value = "—"
-        elif isinstance(leader, discord.Member):
-            leader_value = f"<@{leader.id}>"
+    @party.command(
+        name="dm", description="Recevoir ou non les rappels en message privé"
+    )
+    @app_commands.describe(enabled="Recevoir les rappels en message privé")
+    async def party_dm(self, interaction: discord.Interaction, enabled: bool):
+        await self.defer(interaction)
+
+        user_id = interaction.user.id
+        async with self.db.unit_of_work() as session:
+            opt_out = await session.get(DmOptOut, user_id)
+            if enabled and opt_out:
+                await session.delete(opt_out)
+            elif not enabled and not opt_out:
+                session.add(DmOptOut(user_id=user_id))
+
+        if enabled:
+            self.fanout.opt_outs.discard(user_id)
+            message = "✅ Vous recevrez les rappels en message privé."
         else:
-            leader_value = f"<@{leader}>"
+            self.fanout.opt_outs.add(user_id)
+            message = "✅ Vous ne recevrez plus les rappels en message privé."
 
-        # Leader
-        embed.add_field(
-            name="👑 Leader",
-            value=leader_value,
-            inline=True,
-        )
+        if not Config.DM_REMINDERS:
+            message += "\nℹ️ Les rappels en message privé sont désactivés sur ce bot."
 
-        # Date & Heure
-        embed.add_field(
-            name="📅 Date & Heure",
-            value=event_date.strftime("%d/%m/%Y à %H:%M"),
-            inline=True,
-        )
+        await interaction.followup.send(message, ephemeral=True)
 
-        embed.add_field(name="\u200b", value="\u200b", inline=True)
+    @party.command(
+        name="profile", description="Profiler le bot pendant quelques secondes (admin)"
+    )
+    @app_commands.describe(seconds="Durée de l'échantillonnage (1 à 60 secondes)")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def party_profile(
+        self,
+        interaction: discord.Interaction,
+        seconds: app_commands.Range[int, 1, 60] = 10,
+    ):
+        await self.defer(interaction)
 
-        # Affichage des slots par rôle
-        slot_counter = 1
-        for role_name, weapons in roles_config.items():
-            field_value = ""
-            for weapon, count in weapons.items():
-                for i in range(count):
-                    field_value += f"`{slot_counter}.` {weapon} - *Libre*\n"
-                    slot_counter += 1
+        try:
+            path = await self.bot.profiler.run(seconds)
+        except RuntimeError as e:
+            await interaction.followup.send(f"❌ {e}", ephemeral=True)
+            return
 
-            # Emojis par rôle
-            role_emoji = {"Tank": "🛡️", "Healer": "💚", "DPS": "⚔️"}.get(role_name, "🔹")
+        print(f"🔬 Profil écrit : {path}")
+        await interaction.followup.send(
+            f"✅ Profil de {seconds} s écrit sur le serveur : `{path}`", ephemeral=True
+        )
 
-            embed.add_field(
-                name=f"{role_emoji} {role_name}", value=field_value, inline=False
+    async def get_thread_state(self, thread_id: int):
+        """Retrouver l'activité d'un thread : registre en mémoire, sinon base"""
+        state = self.registry.get_by_thread(thread_id)
+        if state is None:
+            async with self.db.unit_of_work() as session:
+                state = await self.registry.load(session, thread_id)
+        return state
+
+    async def submit(self, interaction, state, command, *args):
+        """Passer une mutation par la boîte aux lettres de l'activité"""
+        # Retourne (False, None) si l'activité a disparu entre-temps
+        try:
+            return True, await self.actors.submit(
+                state.id, lambda session, state: command(session, state, *args)
+            )
+        except LookupError:
+            await interaction.followup.send(
+                "❌ Aucune activité trouvée pour ce thread.", ephemeral=True
             )
+            return False, None
 
-        embed.set_footer(
-            text="💡 Utilisez /party join <slot> pour vous inscrire | /party leave pour partir"
+    async def submit_claim(self, interaction, state, slot: int, user_id: int):
+        """Passer claim_slot par la boîte aux lettres ; un conflit en base devient un refus"""
+        try:
+            return await self.submit(interaction, state, self.claim_slot, slot, user_id)
+        except IntegrityError as e:
+            # Les contraintes uniques arbitrent les écritures hors de la boîte
+            # aux lettres (autre instance, script)
+            error = str(e.orig)
+            if "slot_number" in error or "uq_registrations_activity_slot" in error:
+                return True, ("slot", None)
+            return True, ("user", None)
+
+    async def apply_batch(self, activity_id: int, batch):
+        """Appliquer un lot de commandes en une transaction, puis un seul rendu"""
+        state = self.registry.get(activity_id)
+        if state is None:
+            for _, future in batch:
+                future.set_exception(LookupError(activity_id))
+            return
+
+        if len(batch) == 1:
+            command, future = batch[0]
+            try:
+                [result] = await self.run_commands(state, [command])
+                self.set_command_result(future, result)
+            except Exception as e:
+                future.set_exception(e)
+        else:
+            try:
+                results = await self.run_commands(state, [cmd for cmd, _ in batch])
+            except Exception:
+                # Rejouer une à une pour isoler la commande fautive
+                for item in batch:
+                    await self.apply_batch(activity_id, [item])
+                return
+            for (_, future), result in zip(batch, results):
+                self.set_command_result(future, result)
+
+        self.embed_updater.mark_dirty(activity_id)
+
+    async def run_commands(self, state, commands):
+        """Exécuter des commandes dans une transaction ; en cas d'échec l'état est restauré"""
+        snapshot = state.snapshot()
+        async with self.db.unit_of_work() as session:
+            try:
+                results = []
+                for command in commands:
+                    # Une commande précédente du lot a pu supprimer l'activité
+                    if self.registry.get(state.id) is not state:
+                        results.append(LookupError(state.id))
+                    else:
+                        results.append(await command(session, state))
+                await queries.registration_writes(session).flush(session)
+                await session.commit()
+                return results
+            except Exception:
+                await session.rollback()
+                # La base a tout annulé : la mémoire revient à l'état d'avant le lot,
+                # sans dépendre d'une relecture qui peut échouer pour la même raison
+                state.restore(snapshot)
+                self.registry.add(state)
+                try:
+                    # Rafraîchir au mieux (écritures d'une autre instance, activité supprimée)
+                    if await self.registry.load(session, state.thread_id) is None:
+                        self.registry.remove(state.id)
+                except Exception:
+                    pass
+                raise
+
+    def set_command_result(self, future, result):
+        if isinstance(result, LookupError):
+            future.set_exception(result)
+        else:
+            future.set_result(result)
+
+    async def claim_slot(self, session, state, slot: int, user_id: int):
+        """Commande : inscrire un joueur (vérifications en mémoire, INSERT groupée)"""
+        # Retourne (erreur, (slot, rôle, arme)) lus au moment de la commande : une
+        # commande suivante du même lot peut renuméroter les slots avant la réponse.
+        # Erreur None si l'inscription est créée, sinon la raison du refus :
+        # "user" (déjà inscrit, avec son slot), "missing" (slot inexistant) ou "slot" (slot pris)
+        current = state.user_to_slot.get(user_id)
+        if current is not None:
+            return "user", (current, *state.layout.resolve(current))
+
+        target = state.layout.resolve(slot)
+        if not target:
+            return "missing", None
+
+        if slot in state.slot_to_user:
+            return "slot", None
+
+        role_name, weapon = target
+        state.assign(slot, user_id)
+        queries.registration_writes(session).add(
+            state.id, user_id, role_name, weapon, slot
         )
+        return None, (slot, role_name, weapon)
+
+    async def release_slot(self, session, state, user_id: int):
+        """Commande : libérer le slot d'un joueur ; retourne (slot, rôle, arme), ou None"""
+        slot = state.user_to_slot.get(user_id)
+        if slot is None:
+            return None
+
+        role_name, weapon = state.layout.resolve(slot)
+        state.release_user(user_id)
+        queries.registration_writes(session).remove(state.id, user_id)
+        return slot, role_name, weapon
+
+    async def edit_activity(self, session, state, fields: dict):
+        """Commande : modifier les champs d'une activité ; retourne les échéances replanifiées"""
+        activity = await session.get(Activity, state.id)
+        for name, value in fields.items():
+            setattr(activity, name, value)
+
+        jobs = None
+        if "event_date" in fields:
+            # Réinitialiser le tracker de rappel si la date change
+            activity.last_reminder_sent = None
+            jobs = await self.plan_activity_jobs(session, activity)
+
+        self.registry.put(activity)
+        return jobs
+
+    async def delete_activity(self, session, state):
+        """Commande : supprimer une activité et ses inscriptions"""
+        await queries.registration_writes(session).flush(session)
+        for statement in queries.DELETE_ACTIVITY:
+            await session.execute(statement, {"activity_id": state.id})
+        self.registry.remove(state.id)
+
+    def create_activity_embed(
+        self,
+        title,
+        event_date,
+        leader,
+        layout,
+        slot_to_user=None,
+        activity_id=None,
+        page=0,
+    ):
+        """Créer l'embed d'affichage d'une page de l'activité"""
+        if isinstance(leader, discord.Member):
+            leader = leader.id
 
-        return embed
+        return self.renderer.render(
+            activity_id, title, event_date, leader, layout, slot_to_user or {}, page
+        )
 
     def format_timedelta(self, td):
         """Formater un timedelta en format lisible"""
@@ -940,191 +1157,431 @@ class ActivityCog(commands.Cog):
 
         return " ".join(parts) if parts else "Imminent !"
 
-    async def update_activity_embed(self, activity, session):
-        """Mettre à jour l'embed avec les inscriptions actuelles (slots uniquement)"""
-        # Récupérer toutes les inscriptions
-        registrations = (
-            session.query(Registration).filter_by(activity_id=activity.id).all()
-        )
-
-        slots_taken = {reg.slot_number: reg for reg in registrations}
+    async def flush_activity_embed(self, activity_id):
+        """Re-rendre l'embed d'une activité à partir de son état en mémoire"""
+        state = self.registry.get(activity_id)
+        if state:
+            # Les éditions d'embed passent après les rappels ; la dernière en attente l'emporte
+            await self.outbound.submit(
+                state.channel_id,
+                COSMETIC,
+                lambda: self.update_activity_embed_full(state),
+                key=("embed", activity_id),
+            )
 
-        # Récupérer le message
-        channel = self.bot.get_channel(int(activity.channel_id))
-        if not channel:
-            return
+    async def update_activity_embed_full(self, activity):
+        """Mettre à jour les embeds (titre, date, leader ET slots) des pages modifiées"""
+        pages = paginate(activity.layout)
+        channel = None
+
+        for page in range(len(pages)):
+            embed = self.create_activity_embed(
+                activity.title,
+                activity.event_date,
+                activity.leader,
+                activity.layout,
+                activity.slot_to_user,
+                activity.id,
+                page,
+            )
 
-        try:
-            message = await channel.fetch_message(int(activity.message_id))
-        except:
-            return
+            # Rien de visible n'a changé sur cette page (ex: slot d'une autre page) : pas d'édition
+            message_id = activity.pages[page] if page < len(activity.pages) else None
+            digest = self.renderer.changed(activity.id, message_id, embed)
+            if digest is None:
+                continue
 
-        embed = message.embeds[0]
+            # Message partiel : l'embed est entièrement rendu depuis la mémoire, inutile de le récupérer
+            channel = channel or await self.resolve_channel(activity.channel_id)
+            if not channel:
+                return
 
-        # Mettre à jour les champs de slots
-        slot_counter = 1
-        field_index = 3  # Leader, Date & Heure, Spacer
+            if message_id is None:
+                # Roster agrandi : publier une page de suite
+                message = await channel.send(embed=embed)
+                message_id = message.id
+                await self.add_activity_page(activity, page, message_id)
+            else:
+                try:
+                    await channel.get_partial_message(message_id).edit(embed=embed)
+                except discord.NotFound:
+                    # Message supprimé à la main : rien à mettre à jour
+                    continue
+            self.renderer.mark_sent(activity.id, message_id, digest)
+
+        # Roster réduit : retirer les pages de suite en trop
+        if len(activity.pages) > len(pages):
+            await self.remove_activity_pages(activity, len(pages))
+
+    async def add_activity_page(self, activity, page: int, message_id: int):
+        """Enregistrer le message d'une nouvelle page de suite"""
+        async with self.db.unit_of_work() as session:
+            await session.execute(
+                queries.INSERT_PAGE,
+                {"activity_id": activity.id, "page": page, "message_id": message_id},
+            )
+        activity.pages.append(message_id)
 
-        for role_name, weapons in activity.roles_config.items():
-            field_value = ""
-            for weapon, count in weapons.items():
-                for i in range(count):
-                    if slot_counter in slots_taken:
-                        reg = slots_taken[slot_counter]
-                        user = f"<@{reg.user_id}>"
-                        field_value += f"`{slot_counter}.` {weapon} - {user}\n"
-                    else:
-                        field_value += f"`{slot_counter}.` {weapon} - *Libre*\n"
-                    slot_counter += 1
+    async def remove_activity_pages(self, activity, count: int):
+        """Supprimer les pages de suite au-delà des count premières"""
+        async with self.db.unit_of_work() as session:
+            await session.execute(
+                queries.DELETE_PAGES_FROM, {"activity_id": activity.id, "page": count}
+            )
 
-            role_emoji = {"Tank": "🛡️", "Healer": "💚", "DPS": "⚔️"}.get(role_name, "🔹")
+        extra = activity.pages[count:]
+        del activity.pages[count:]
 
-            embed.set_field_at(
-                field_index,
-                name=f"{role_emoji} {role_name}",
-                value=field_value,
-                inline=False,
+        channel = await self.resolve_channel(activity.channel_id)
+        for message_id in extra if channel else ():
+            self.outbound.submit(
+                channel.id, NORMAL, channel.get_partial_message(message_id).delete
             )
-            field_index += 1
-
-        await message.edit(embed=embed)
 
-    async def update_activity_embed_full(self, activity, session):
-        """Mettre à jour l'embed complet (titre, date, leader ET slots)"""
-        # Récupérer toutes les inscriptions
-        registrations = (
-            session.query(Registration).filter_by(activity_id=activity.id).all()
-        )
+    async def resolve_channel(self, channel_id: int, raise_not_found: bool = False):
+        """Résoudre un salon ou un thread, avec mise en cache"""
+        # None si introuvable ; raise_not_found : NotFound (supprimé) remonte à l'appelant
+        channel = self.channels.get(channel_id)
+        if channel is not None:
+            return channel
+
+        channel = self.bot.get_channel(channel_id)
+        for _ in range(self.FETCH_RETRIES):
+            if channel is not None:
+                break
+            try:
+                channel = await self.bot.fetch_channel(channel_id)
+            except discord.RateLimited as e:
+                # 429 au-delà de max_ratelimit_timeout (hors file d'envoi) : attendre puis réessayer
+                await asyncio.sleep(e.retry_after)
+            except discord.NotFound:
+                if raise_not_found:
+                    raise
+                return None
+            except discord.HTTPException:
+                return None
+        if channel is None:
+            return None
 
-        slots_taken = {reg.slot_number: reg for reg in registrations}
+        self.channels[channel_id] = channel
+        return channel
 
-        # Récupérer le message
-        channel = self.bot.get_channel(int(activity.channel_id))
-        if not channel:
-            return
+    async def start_scheduler(self):
+        """Démarrer l'ordonnanceur puis rattraper les échéances manquées"""
+        await self.bot.wait_until_ready()
 
+        # L'ordonnanceur tourne avant le rattrapage : s'il échoue, l'échéance
+        # "horizon" le reprend (rattrapage et première fenêtre) plus tard
+        self.scheduler.start()
         try:
-            message = await channel.fetch_message(int(activity.message_id))
-        except:
-            return
+            await self.on_deadline("horizon")
+        except Exception as e:
+            print(f"❌ Erreur lors du rattrapage des échéances : {e}")
+
+        # Archivage au démarrage puis à intervalle régulier
+        self.scheduler.schedule("archive", datetime.now())
+        print(f"⏰ {len(self.scheduler)} échéance(s) planifiée(s)")
+
+    async def plan_activity_jobs(self, session, activity):
+        """(Re)créer les échéances en attente d'une activité (sans commit)"""
+        await session.flush()
+        await session.execute(
+            delete(ScheduledJob).where(
+                ScheduledJob.activity_id == activity.id,
+                ScheduledJob.status == "pending",
+            )
+        )
 
-        # Récréer l'embed complet avec les nouvelles infos
-        embed = discord.Embed(title=activity.title, color=Config.COLOR_PRIMARY)
+        now = datetime.now()
+        jobs = []
+        for minutes in activity.reminders or []:
+            # Les rappels partent du plus lointain au plus proche
+            if (
+                activity.last_reminder_sent is not None
+                and minutes >= activity.last_reminder_sent
+            ):
+                continue
+
+            fire_at = activity.event_date - timedelta(minutes=minutes)
+            if fire_at > now:
+                jobs.append(
+                    ScheduledJob(
+                        activity_id=activity.id,
+                        kind="reminder",
+                        minutes=minutes,
+                        fire_at=fire_at,
+                    )
+                )
 
-        # Leader
-        embed.add_field(
-            name="👑 Leader",
-            value=f"<@{activity.leader}>",
-            inline=True,
+        jobs.append(
+            ScheduledJob(
+                activity_id=activity.id, kind="start", fire_at=activity.event_date
+            )
         )
 
-        # Date & Heure
-        embed.add_field(
-            name="📅 Date & Heure",
-            value=activity.event_date.strftime("%d/%m/%Y à %H:%M"),
-            inline=True,
-        )
+        session.add_all(jobs)
+        await session.flush()
+        return jobs
+
+    def schedule_jobs(self, jobs):
+        """Mettre en mémoire les échéances qui tombent dans la fenêtre chargée"""
+        if self.horizon_end is None:
+            return
+
+        for job in jobs:
+            if job.fire_at < self.horizon_end:
+                self.scheduler.schedule(job.id, job.fire_at, group=job.activity_id)
+
+    async def backfill_activity_jobs(self):
+        """Créer les échéances des activités actives qui n'en ont aucune"""
+        async with self.db.unit_of_work() as session:
+            activities = (
+                await session.scalars(
+                    select(Activity).filter(
+                        Activity.is_active == True, ~Activity.jobs.any()
+                    )
+                )
+            ).all()
 
-        embed.add_field(name="\u200b", value="\u200b", inline=True)
-
-        # Affichage des slots par rôle
-        slot_counter = 1
-        for role_name, weapons in activity.roles_config.items():
-            field_value = ""
-            for weapon, count in weapons.items():
-                for i in range(count):
-                    if slot_counter in slots_taken:
-                        reg = slots_taken[slot_counter]
-                        user = f"<@{reg.user_id}>"
-                        field_value += f"`{slot_counter}.` {weapon} - {user}\n"
+            for activity in activities:
+                await self.plan_activity_jobs(session, activity)
+
+    async def recover_overdue_jobs(self):
+        """Déclencher ou expirer en bloc les échéances passées pendant un arrêt"""
+        now = datetime.now()
+        catchup = timedelta(minutes=Config.JOB_CATCHUP_MINUTES)
+
+        async with self.db.unit_of_work() as session:
+            # Une seule requête sur l'index (status, fire_at)
+            rows = (await session.execute(queries.OVERDUE_JOBS, {"now": now})).all()
+
+            to_fire = []
+            to_expire = []
+            finished_activities = set()
+            last_reminders = {}
+
+            # Chaque ligne porte l'échéance et l'état de son activité
+            for job in rows:
+                if job.kind == "start":
+                    if now - job.fire_at <= catchup:
+                        to_fire.append(job.id)
                     else:
-                        field_value += f"`{slot_counter}.` {weapon} - *Libre*\n"
-                    slot_counter += 1
+                        to_expire.append(job.id)
+                        finished_activities.add(job.activity_id)
+                elif job.is_active and job.event_date > now:
+                    # Seul le rappel le plus proche de l'event reste pertinent
+                    previous = last_reminders.get(job.activity_id)
+                    if previous is not None:
+                        to_expire.append(previous)
+                    last_reminders[job.activity_id] = job.id
+                else:
+                    to_expire.append(job.id)
 
-            role_emoji = {"Tank": "🛡️", "Healer": "💚", "DPS": "⚔️"}.get(role_name, "🔹")
+            to_fire.extend(last_reminders.values())
 
-            embed.add_field(
-                name=f"{role_emoji} {role_name}", value=field_value, inline=False
+            if to_expire:
+                await session.execute(
+                    update(ScheduledJob)
+                    .where(ScheduledJob.id.in_(to_expire))
+                    .values(status="expired")
+                )
+            if finished_activities:
+                await session.execute(
+                    update(Activity)
+                    .where(Activity.id.in_(finished_activities))
+                    .values(is_active=False)
+                )
+
+        if rows:
+            print(
+                f"🔁 Rattrapage : {len(to_fire)} échéance(s) déclenchée(s), "
+                f"{len(to_expire)} expirée(s)"
             )
 
-        embed.set_footer(
-            text="💡 Utilisez /party join <slot> pour vous inscrire | /party leave pour partir"
+        results = await asyncio.gather(
+            *(self.on_deadline(job_id) for job_id in to_fire), return_exceptions=True
         )
+        for job_id, result in zip(to_fire, results):
+            if isinstance(result, Exception):
+                print(f"❌ Erreur lors de l'échéance {job_id}: {result}")
+        return now
+
+    async def load_jobs_window(self, since):
+        """Charger les échéances de la prochaine fenêtre dans l'ordonnanceur"""
+        until = datetime.now() + timedelta(hours=Config.SCHEDULER_HORIZON_HOURS)
+
+        async with self.db.unit_of_work() as session:
+            jobs = (
+                await session.execute(
+                    queries.JOBS_WINDOW, {"since": since, "until": until}
+                )
+            ).all()
 
-        await message.edit(embed=embed)
+        # La fenêtre n'avance qu'une fois ses échéances lues
+        self.horizon_end = until
+        self.schedule_jobs(jobs)
 
-    @tasks.loop(minutes=1)
-    async def check_reminders(self):
-        """Vérifier les rappels d'activités"""
-        session = self.db.get_session()
+    async def reload_jobs_window(self):
+        """Échéance "horizon" : charger la fenêtre suivante, réessayée en cas d'échec"""
+        previous = self.horizon_end
         try:
-            now = datetime.now()
-            activities = (
-                session.query(Activity)
-                .filter(Activity.is_active == True, Activity.event_date > now)
-                .all()
-            )
-
-            for activity in activities:
-                time_until = (activity.event_date - now).total_seconds() / 60
-
-                # CORRECTION: Vérifier si on n'a pas déjà envoyé le rappel pour cette activité
-                # Envoyer le rappel à 30 minutes si pas encore envoyé
-                if 29 <= time_until <= 31 and activity.last_reminder_sent != 30:
-                    await self.send_reminder(activity, 30, session)
-                    activity.last_reminder_sent = 30
-                    session.commit()
-
-                # Démarrer l'activité si c'est l'heure
-                if time_until <= 0:
-                    await self.start_activity(activity, session)
+            if previous is None:
+                # Aucune fenêtre chargée (démarrage) : rattraper d'abord les échéances manquées
+                await self.backfill_activity_jobs()
+                since = await self.recover_overdue_jobs()
+            else:
+                since = previous
+            await self.load_jobs_window(since)
         finally:
-            session.close()
+            if self.horizon_end != previous:
+                # Recharger la fenêtre suivante à son terme
+                self.horizon_failures = 0
+                self.scheduler.schedule("horizon", self.horizon_end)
+            else:
+                # Lecture échouée (base occupée...) : réessayer avec un délai croissant
+                delay = Config.SCHEDULER_RETRY_SECONDS * 2 ** min(
+                    self.horizon_failures, 5
+                )
+                self.horizon_failures += 1
+                self.scheduler.schedule(
+                    "horizon", datetime.now() + timedelta(seconds=delay)
+                )
 
-    async def send_reminder(self, activity, minutes, session):
-        """Envoyer un rappel dans le thread (uniquement aux inscrits)"""
-        thread = self.bot.get_channel(int(activity.thread_id))
-        if not thread:
-            return
+    async def archive_activities(self):
+        """Archiver par lots les activités terminées depuis la durée de rétention"""
+        before = datetime.now() - timedelta(days=Config.ARCHIVE_RETENTION_DAYS)
+        total = 0
 
-        # Récupérer tous les inscrits
-        registrations = (
-            session.query(Registration).filter_by(activity_id=activity.id).all()
-        )
+        while True:
+            # Une transaction par lot : les commandes passent entre deux lots
+            async with self.db.unit_of_work() as session:
+                archived = await archive_batch(
+                    session, before, Config.ARCHIVE_BATCH_SIZE
+                )
 
-        if not registrations:
-            # Pas d'inscrits, ne pas envoyer de rappel
+            for activity_id in archived:
+                self.registry.remove(activity_id)
+                self.renderer.forget(activity_id)
+            total += len(archived)
+
+            if len(archived) < Config.ARCHIVE_BATCH_SIZE:
+                break
+            await asyncio.sleep(0)
+
+        if total:
+            print(f"🗄️ {total} activité(s) archivée(s)")
+
+    async def on_deadline(self, key):
+        """Envoyer un rappel ou démarrer l'activité à son échéance"""
+        if key == "horizon":
+            await self.reload_jobs_window()
             return
 
-        # Créer la liste des mentions
-        mentions = " ".join([f"<@{reg.user_id}>" for reg in registrations])
+        if key == "archive":
+            try:
+                await self.archive_activities()
+            finally:
+                self.scheduler.schedule(
+                    "archive",
+                    datetime.now() + timedelta(hours=Config.ARCHIVE_INTERVAL_HOURS),
+                )
+            return
 
-        await thread.send(
-            f"⏰ {mentions} **Rappel !** L'activité **{activity.title}** commence dans **{minutes} minutes** !"
+        # Lecture : échéance, activité et inscrits, puis connexion libérée
+        async with self.db.unit_of_work() as session:
+            job = (await session.execute(queries.DEADLINE, {"job_id": key})).first()
+            if not job:
+                return
+
+            user_ids = (
+                await session.scalars(
+                    queries.REGISTERED_USERS, {"activity_id": job.activity_id}
+                )
+            ).all()
+
+        # Retard réel de l'échéance (boucle chargée, rattrapage au démarrage)
+        self.bot.metrics.observe(
+            "hrzn_reminder_lag_seconds",
+            max((datetime.now() - job.fire_at).total_seconds(), 0.0),
+            kind=job.kind,
         )
 
-    async def start_activity(self, activity, session):
-        """Démarrer l'activité"""
-        thread = self.bot.get_channel(int(activity.thread_id))
+        # Envois Discord hors transaction (objets détachés, déjà chargés)
+        # La ligne d'échéance porte les champs de l'activité (thread, titre, leader)
+        values = {}
+        if job.kind == "reminder" and job.is_active:
+            # Temps réellement restant (un rappel rattrapé peut être en retard)
+            minutes_left = round((job.event_date - datetime.now()).total_seconds() / 60)
+            await self.send_reminder(job, max(minutes_left, 1), user_ids)
+            values["last_reminder_sent"] = job.minutes
+        elif job.kind == "start" and job.is_active:
+            started = await self.start_activity(job, user_ids)
+            if started is None:
+                # Thread injoignable pour l'instant : l'échéance reste en attente
+                self.retry_job(job)
+                return
+            # Démarrée, ou thread supprimé : l'activité est terminée dans les deux cas
+            values["is_active"] = False
+        self.job_failures.pop(job.id, None)
+
+        # Écriture : échéance faite, dans une transaction courte
+        async with self.db.unit_of_work() as session:
+            await session.execute(queries.JOB_DONE, {"job_id": job.id})
+            if values:
+                await session.execute(
+                    update(Activity)
+                    .where(Activity.id == job.activity_id)
+                    .values(**values)
+                )
+
+    def retry_job(self, job):
+        """Replanifier une échéance en attente avec un délai croissant"""
+        failures = self.job_failures.get(job.id, 0)
+        self.job_failures[job.id] = failures + 1
+        delay = Config.SCHEDULER_RETRY_SECONDS * 2 ** min(failures, 5)
+        self.scheduler.schedule(
+            job.id, datetime.now() + timedelta(seconds=delay), group=job.activity_id
+        )
+
+    async def send_reminder(self, activity, minutes, user_ids):
+        """Envoyer un rappel dans le thread (uniquement aux inscrits)"""
+        thread = await self.resolve_channel(activity.thread_id)
         if not thread:
             return
 
-        registrations = (
-            session.query(Registration).filter_by(activity_id=activity.id).all()
+        if not user_ids:
+            # Pas d'inscrits, ne pas envoyer de rappel
+            return
+
+        # Mentions découpées en messages valides, DMs si activés
+        await self.fanout.notify(
+            thread,
+            f"⏰ **Rappel !** L'activité **{activity.title}** commence dans **{minutes} minutes** !",
+            user_ids,
+            f"Rappel {activity.title}",
         )
 
-        # Créer la liste des mentions
-        mentions = " ".join([f"<@{reg.user_id}>" for reg in registrations])
+    async def start_activity(self, activity, user_ids) -> bool:
+        """Démarrer l'activité ; False si son thread a été supprimé, None s'il est injoignable"""
+        try:
+            thread = await self.resolve_channel(
+                activity.thread_id, raise_not_found=True
+            )
+        except discord.NotFound:
+            return False
+        if not thread:
+            return None
 
-        await thread.send(
-            f"🚨 {mentions} **MASS UP !**\n\n"
+        await self.fanout.notify(
+            thread,
+            f"🚨 **MASS UP !**\n\n"
             f"L'activité **{activity.title}** commence maintenant !\n"
-            f"👥 **{len(registrations)} joueurs inscrits**\n"
-            f"👑 Leader : <@{activity.leader}>"
+            f"👥 **{len(user_ids)} joueurs inscrits**\n"
+            f"👑 Leader : <@{activity.leader}>",
+            user_ids,
+            f"MASS UP {activity.title}",
         )
-
-        activity.is_active = False
-        session.commit()
+        return True
 
 
 async def setup(bot):
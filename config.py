@@ -7,7 +7,18 @@ load_dotenv()
 
 class Config:
     DISCORD_TOKEN = os.getenv("DISCORD_TOKEN")
-    DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///hrzn.db")
+    DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///hrzn.db")
+
+    # Profil SQLite (pragmas à la connexion) : attente de verrou, mmap et cache en Mo
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    SQLITE_MMAP_MB = int(os.getenv("SQLITE_MMAP_MB", "256"))
+    SQLITE_CACHE_MB = int(os.getenv("SQLITE_CACHE_MB", "64"))
+
+    # Profil Postgres : pool de connexions (recyclage en secondes)
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
 
     # Couleurs
     COLOR_PRIMARY = 0x5865F2
@@ -18,5 +29,47 @@ class Config:
     # Délais par défaut - un seul rappel à 30 minutes
     DEFAULT_REMINDER_MINUTES = [30]
 
+    # Échéances : fenêtre chargée en mémoire et retard toléré après un redémarrage
+    SCHEDULER_HORIZON_HOURS = int(os.getenv("SCHEDULER_HORIZON_HOURS", "24"))
+    JOB_CATCHUP_MINUTES = int(os.getenv("JOB_CATCHUP_MINUTES", "60"))
+    # Premier délai avant de réessayer un rechargement de fenêtre échoué (doublé à chaque échec)
+    SCHEDULER_RETRY_SECONDS = int(os.getenv("SCHEDULER_RETRY_SECONDS", "30"))
+
+    # Délai minimal entre deux éditions de l'embed d'une même activité (secondes)
+    EMBED_UPDATE_WINDOW_SECONDS = float(os.getenv("EMBED_UPDATE_WINDOW_SECONDS", "2"))
+
+    # Une activité sans mutation pendant ce délai libère sa boîte aux lettres (secondes)
+    ACTOR_IDLE_SECONDS = float(os.getenv("ACTOR_IDLE_SECONDS", "30"))
+
+    # Envois Discord simultanés au plus (file d'envoi centrale)
+    OUTBOUND_CONCURRENCY = int(os.getenv("OUTBOUND_CONCURRENCY", "4"))
+
+    # Rappels : diffusions simultanées, et copie en message privé (désactivée par défaut)
+    FANOUT_CONCURRENCY = int(os.getenv("FANOUT_CONCURRENCY", "8"))
+    DM_REMINDERS = os.getenv("DM_REMINDERS", "false").lower() == "true"
+    DM_CONCURRENCY = int(os.getenv("DM_CONCURRENCY", "5"))
+
+    # Archivage des activités terminées depuis plus de ARCHIVE_RETENTION_DAYS jours
+    ARCHIVE_RETENTION_DAYS = int(os.getenv("ARCHIVE_RETENTION_DAYS", "30"))
+    ARCHIVE_INTERVAL_HOURS = int(os.getenv("ARCHIVE_INTERVAL_HOURS", "6"))
+    ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "200"))
+
+    # Métriques Prometheus et sonde /ready sur un port local (0 = désactivé)
+    METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+    METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))
+
+    # Surveillance de la boucle asyncio (désactivée par défaut) et profilage à la demande
+    WATCHDOG_ENABLED = os.getenv("WATCHDOG_ENABLED", "false").lower() == "true"
+    WATCHDOG_THRESHOLD_MS = int(os.getenv("WATCHDOG_THRESHOLD_MS", "200"))
+    PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+    PROFILE_SECONDS = int(
+        os.getenv("PROFILE_SECONDS", "10")
+    )  # Profil déclenché par SIGUSR1
+
+    # Synchronisation des commandes slash : serveur de dev (0 = global) et empreinte
+    # de la dernière synchronisation réussie (supprimer le fichier force la suivante)
+    DEV_GUILD_ID = int(os.getenv("DEV_GUILD_ID", "0"))
+    COMMAND_SYNC_FILE = os.getenv("COMMAND_SYNC_FILE", ".command_tree.json")
+
     if not DISCORD_TOKEN:
         raise RuntimeError("DISCORD_TOKEN non définie dans le .env")
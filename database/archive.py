@@ -0,0 +1,85 @@
+from datetime import datetime
+
+from sqlalchemy import DateTime, case, delete, insert, literal, select
+
+from database.models import (
+    Activity,
+    ActivityMessage,
+    ArchivedActivity,
+    ArchivedRegistration,
+    Registration,
+    ScheduledJob,
+)
+
+# Les archives ont leurs propres ids : ceux des tables chaudes peuvent être réutilisés
+ACTIVITY_COLUMNS = [
+    "message_id",
+    "thread_id",
+    "channel_id",
+    "guild_id",
+    "title",
+    "leader",
+    "event_date",
+    "ping_role_id",
+    "roles_config",
+    "created_at",
+]
+REGISTRATION_COLUMNS = [
+    "user_id",
+    "role_name",
+    "weapon",
+    "slot_number",
+    "registered_at",
+]
+
+
+def finished_activities(before: datetime, limit: int):
+    """Activités terminées avant `before`, les plus anciennes d'abord"""
+    return (
+        select(Activity.id)
+        .filter(Activity.is_active == False, Activity.event_date < before)
+        .order_by(Activity.event_date)
+        .limit(limit)
+    )
+
+
+async def archive_batch(session, before: datetime, limit: int) -> list:
+    """Déplacer un lot d'activités terminées et de leurs inscriptions vers l'archive"""
+    # Retourne les ids archivés ; la transaction est validée par l'appelant
+    ids = (await session.scalars(finished_activities(before, limit))).all()
+    if not ids:
+        return []
+
+    activities = Activity.__table__
+    archived = ArchivedActivity.__table__
+    rows = await session.execute(
+        insert(archived)
+        .from_select(
+            ["source_id"] + ACTIVITY_COLUMNS + ["archived_at"],
+            select(
+                activities.c.id,
+                *(activities.c[name] for name in ACTIVITY_COLUMNS),
+                literal(datetime.utcnow(), DateTime),
+            ).where(activities.c.id.in_(ids)),
+        )
+        .returning(archived.c.source_id, archived.c.id)
+    )
+    archive_ids = dict(rows.all())  # id dans activities -> id dans l'archive
+
+    # Les inscriptions pointent vers la nouvelle clé de leur activité archivée
+    registrations = Registration.__table__
+    await session.execute(
+        insert(ArchivedRegistration.__table__).from_select(
+            ["activity_id"] + REGISTRATION_COLUMNS,
+            select(
+                case(archive_ids, value=registrations.c.activity_id),
+                *(registrations.c[name] for name in REGISTRATION_COLUMNS),
+            ).where(registrations.c.activity_id.in_(ids)),
+        )
+    )
+
+    # Vider les tables chaudes : dépendances d'abord
+    for model in (Registration, ScheduledJob, ActivityMessage):
+        await session.execute(delete(model).where(model.activity_id.in_(ids)))
+    await session.execute(delete(Activity).where(Activity.id.in_(ids)))
+    return ids
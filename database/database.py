@@ -1,15 +1,180 @@
-from sqlalchemy import create_engine
+import asyncio
+from contextlib import asynccontextmanager
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import CursorResult, make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
 from config import Config
+from database.migrations import run_migrations
 from database.models import Base
+from database.session_guard import SESSION_OPEN
+
+# Drivers asynchrones reconnus dans DATABASE_URL (ex: sqlite+aiosqlite://, postgresql+asyncpg://)
+ASYNC_DRIVERS = {"aiosqlite", "asyncpg"}
+
+# Profil SQLite : WAL (les lecteurs ne bloquent plus l'écrivain), fsync allégé
+# (sûr en WAL), attente des verrous au lieu d'échouer, lectures en mmap
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    f"PRAGMA busy_timeout={Config.SQLITE_BUSY_TIMEOUT_MS}",
+    f"PRAGMA mmap_size={Config.SQLITE_MMAP_MB * 1024 * 1024}",
+    f"PRAGMA cache_size=-{Config.SQLITE_CACHE_MB * 1024}",
+)
+
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for pragma in SQLITE_PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+
+
+def engine_options(url) -> dict:
+    """Options de moteur selon la base : pool réglé et vérifié pour Postgres"""
+    if url.get_backend_name() == "postgresql":
+        return {
+            "pool_size": Config.DB_POOL_SIZE,
+            "max_overflow": Config.DB_MAX_OVERFLOW,
+            "pool_timeout": Config.DB_POOL_TIMEOUT,
+            "pool_recycle": Config.DB_POOL_RECYCLE,
+            "pool_pre_ping": True,  # Connexions coupées par le serveur détectées
+        }
+    return {}
+
+
+class SyncSessionAdapter:
+    """Session synchrone exposée avec l'API d'AsyncSession (exécutée dans un thread)"""
+
+    def __init__(self, session):
+        self._session = session
+
+    @property
+    def info(self):
+        return self._session.info
+
+    def add(self, instance):
+        self._session.add(instance)
+
+    def add_all(self, instances):
+        self._session.add_all(instances)
+
+    def _execute_buffered(self, *args, **kwargs):
+        # Les lignes sont lues ici, dans le thread : le Result rendu à la boucle
+        # ne touche plus au curseur ni à la connexion
+        result = self._session.execute(*args, **kwargs)
+        if isinstance(result, CursorResult) and not result.returns_rows:
+            return result  # UPDATE/DELETE : rien à lire, rowcount déjà connu
+        return result.freeze()()
+
+    async def execute(self, *args, **kwargs):
+        return await asyncio.to_thread(self._execute_buffered, *args, **kwargs)
+
+    async def scalar(self, *args, **kwargs):
+        return await asyncio.to_thread(self._session.scalar, *args, **kwargs)
+
+    async def scalars(self, *args, **kwargs):
+        result = await asyncio.to_thread(self._execute_buffered, *args, **kwargs)
+        return result.scalars()
+
+    async def get(self, *args, **kwargs):
+        return await asyncio.to_thread(self._session.get, *args, **kwargs)
+
+    async def delete(self, instance):
+        await asyncio.to_thread(self._session.delete, instance)
+
+    async def flush(self):
+        await asyncio.to_thread(self._session.flush)
+
+    async def commit(self):
+        await asyncio.to_thread(self._session.commit)
+
+    async def rollback(self):
+        await asyncio.to_thread(self._session.rollback)
+
+    async def close(self):
+        await asyncio.to_thread(self._session.close)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+
+def create_schema(engine):
+    Base.metadata.create_all(engine)
+    run_migrations(engine)
 
 
 class Database:
-    def __init__(self):
-        self.engine = create_engine(Config.DATABASE_URL)
-        Base.metadata.create_all(self.engine)
-        self.Session = sessionmaker(bind=self.engine)
+    def __init__(self, url: str = None, tuned: bool = True):
+        url = make_url(url or Config.DATABASE_URL)
+        self.is_async = url.get_driver_name() in ASYNC_DRIVERS
+
+        # Profil de moteur choisi d'après l'URL (tuned=False : réglages par défaut)
+        options = engine_options(url) if tuned else {}
+        sqlite = tuned and url.get_backend_name() == "sqlite"
+
+        # Un seul moteur et un seul driver : celui de l'URL. En mode asynchrone,
+        # self.engine est la face synchrone du moteur (événements, run_sync)
+        if self.is_async:
+            self.async_engine = create_async_engine(url, **options)
+            self.engine = self.async_engine.sync_engine
+            self.AsyncSession = async_sessionmaker(
+                self.async_engine, expire_on_commit=False
+            )
+            self.Session = None
+        else:
+            self.async_engine = None
+            self.engine = create_engine(url, **options)
+            self.AsyncSession = None
+            self.Session = sessionmaker(bind=self.engine)
+        if sqlite:
+            event.listen(self.engine, "connect", apply_sqlite_pragmas)
+
+    async def create_schema(self):
+        """Créer les tables puis appliquer les migrations (au démarrage, avant usage)"""
+        await self.run_sync(create_schema)
+
+    async def run_sync(self, func, *args):
+        """Exécuter func(engine, *args), code SQLAlchemy synchrone, sans bloquer la boucle"""
+        if self.is_async:
+            # Le pont greenlet de run_sync permet au code synchrone d'utiliser
+            # le moteur asynchrone, y compris pour ouvrir d'autres connexions
+            async with self.async_engine.connect() as connection:
+                return await connection.run_sync(
+                    lambda sync_connection: func(sync_connection.engine, *args)
+                )
+        return await asyncio.to_thread(func, self.engine, *args)
+
+    def session(self):
+        """Ouvrir une session utilisable avec await, sans bloquer la boucle asyncio"""
+        if self.is_async:
+            return self.AsyncSession()
+        return SyncSessionAdapter(self.Session(expire_on_commit=False))
+
+    @asynccontextmanager
+    async def unit_of_work(self):
+        """Transaction courte : lire, modifier, valider, puis libérer la connexion"""
+        # Validée à la sortie du bloc, annulée sur exception ; aucun appel Discord dedans
+        session = self.session()
+        token = SESSION_OPEN.set(True)
+        try:
+            yield session
+            await session.commit()
+        except BaseException:
+            await session.rollback()
+            raise
+        finally:
+            SESSION_OPEN.reset(token)
+            await session.close()
 
-    def get_session(self):
-        return self.Session()
+    async def close(self):
+        """Libérer les connexions des moteurs"""
+        if self.async_engine is not None:
+            await self.async_engine.dispose()
+        else:
+            self.engine.dispose()
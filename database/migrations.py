@@ -0,0 +1,223 @@
+from datetime import datetime
+
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    DateTime,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    delete,
+    func,
+    inspect,
+    insert,
+    select,
+    text,
+)
+
+from database.models import (
+    Activity,
+    ActivityMessage,
+    ArchivedActivity,
+    ArchivedRegistration,
+    Base,
+    DmOptOut,
+    Registration,
+)
+
+# Versions de schéma déjà appliquées (table hors des modèles)
+schema_migrations = Table(
+    "schema_migrations",
+    MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+MIGRATIONS = []
+
+
+def migration(version: int):
+    """Enregistrer une migration ; elle reçoit le moteur et gère ses transactions"""
+
+    def decorator(apply):
+        MIGRATIONS.append((version, apply))
+        MIGRATIONS.sort(key=lambda item: item[0])
+        return apply
+
+    return decorator
+
+
+def run_migrations(engine):
+    """Appliquer dans l'ordre les migrations qui ne l'ont pas encore été"""
+    schema_migrations.create(engine, checkfirst=True)
+
+    with engine.connect() as connection:
+        applied = set(connection.scalars(select(schema_migrations.c.version)))
+
+    for version, apply in MIGRATIONS:
+        if version in applied:
+            continue
+
+        apply(engine)
+        with engine.begin() as connection:
+            connection.execute(
+                insert(schema_migrations).values(
+                    version=version, name=apply.__name__, applied_at=datetime.utcnow()
+                )
+            )
+        print(f"🧱 Migration {version} appliquée : {apply.__name__}")
+
+
+def add_index(engine, index):
+    """Ajouter un index sans bloquer une base en service (idempotent)"""
+    existing = {ix["name"] for ix in inspect(engine).get_indexes(index.table.name)}
+    if index.name in existing:
+        return
+
+    if engine.dialect.name == "postgresql":
+        # CONCURRENTLY n'est pas permis dans une transaction
+        columns = ", ".join(column.name for column in index.columns)
+        unique = "UNIQUE " if index.unique else ""
+        with engine.connect().execution_options(
+            isolation_level="AUTOCOMMIT"
+        ) as connection:
+            connection.execute(
+                text(
+                    f"CREATE {unique}INDEX CONCURRENTLY IF NOT EXISTS {index.name} "
+                    f"ON {index.table.name} ({columns})"
+                )
+            )
+    else:
+        with engine.begin() as connection:
+            index.create(connection, checkfirst=True)
+
+
+def get_index(table, name):
+    return next(index for index in table.indexes if index.name == name)
+
+
+@migration(1)
+def registrations_unique_constraints(engine):
+    """Dédoublonner les inscriptions puis poser les index uniques"""
+    existing = {ix["name"] for ix in inspect(engine).get_indexes("registrations")}
+
+    table = Registration.__table__
+    for index in table.indexes:
+        if not index.unique or index.name in existing:
+            continue
+
+        # Garder l'inscription la plus ancienne de chaque doublon
+        columns = [table.c[column.name] for column in index.columns]
+        keep = select(func.min(table.c.id)).group_by(*columns)
+        with engine.begin() as connection:
+            connection.execute(delete(table).where(table.c.id.not_in(keep)))
+
+        add_index(engine, index)
+
+
+@migration(2)
+def hot_path_indexes(engine):
+    """Index des requêtes chaudes sur les bases créées avant leur déclaration"""
+    # registrations.activity_id est servi par le préfixe de uq_registrations_activity_slot
+    add_index(engine, get_index(Activity.__table__, "ix_activities_active_event_date"))
+
+
+def rebuild_sqlite_table(connection, table, casts):
+    """Reconstruire une table SQLite au schéma du modèle (pas d'ALTER COLUMN TYPE)"""
+    # Procédure documentée par SQLite : nouvelle table, copie, suppression, renommage
+    existing = [
+        column["name"] for column in inspect(connection).get_columns(table.name)
+    ]
+    for index in inspect(connection).get_indexes(table.name):
+        connection.execute(text(f"DROP INDEX IF EXISTS {index['name']}"))
+
+    # Copie des tables référencées pour résoudre les clés étrangères
+    metadata = MetaData()
+    for other in Base.metadata.sorted_tables:
+        other.to_metadata(metadata)
+    staging = table.to_metadata(metadata, name=f"{table.name}_new")
+    staging.indexes.clear()
+    staging.create(connection)
+
+    columns = [name for name in existing if name in table.c]
+    values = [f"CAST({name} AS INTEGER)" if name in casts else name for name in columns]
+    connection.execute(
+        text(
+            f"INSERT INTO {staging.name} ({', '.join(columns)}) "
+            f"SELECT {', '.join(values)} FROM {table.name}"
+        )
+    )
+    connection.execute(text(f"DROP TABLE {table.name}"))
+    connection.execute(text(f"ALTER TABLE {staging.name} RENAME TO {table.name}"))
+    for index in table.indexes:
+        index.create(connection)
+
+
+@migration(3)
+def snowflakes_bigint(engine):
+    """Convertir les identifiants Discord stockés en texte vers BIGINT"""
+    tables = (
+        Activity,
+        Registration,
+        ActivityMessage,
+        DmOptOut,
+        ArchivedActivity,
+        ArchivedRegistration,
+    )
+    for model in tables:
+        table = model.__table__
+        current = {
+            column["name"]: column["type"]
+            for column in inspect(engine).get_columns(table.name)
+        }
+        # Bases créées après le passage en BIGINT : rien à convertir
+        casts = [
+            column.name
+            for column in table.columns
+            if isinstance(column.type, BigInteger)
+            and column.name in current
+            and isinstance(current[column.name], String)
+        ]
+        if not casts:
+            continue
+
+        with engine.begin() as connection:
+            if engine.dialect.name == "postgresql":
+                # Les index (dont les uniques) sont reconstruits par PostgreSQL
+                for name in casts:
+                    connection.execute(
+                        text(
+                            f"ALTER TABLE {table.name} ALTER COLUMN {name} "
+                            f"TYPE BIGINT USING {name}::bigint"
+                        )
+                    )
+            else:
+                rebuild_sqlite_table(connection, table, casts)
+
+
+@migration(4)
+def archive_own_ids(engine):
+    """Donner aux archives leurs propres ids et garder l'id d'origine dans source_id"""
+    table = ArchivedActivity.__table__
+    columns = {column["name"] for column in inspect(engine).get_columns(table.name)}
+    with engine.begin() as connection:
+        if "source_id" not in columns:
+            # Jusqu'ici l'archive recopiait l'id d'origine
+            connection.execute(
+                text(f"ALTER TABLE {table.name} ADD COLUMN source_id INTEGER")
+            )
+            connection.execute(text(f"UPDATE {table.name} SET source_id = id"))
+
+        if engine.dialect.name == "postgresql":
+            # Ids fournis à l'insertion : les séquences n'ont jamais avancé
+            for name in (table.name, ArchivedRegistration.__tablename__):
+                connection.execute(
+                    text(
+                        f"SELECT setval(pg_get_serial_sequence('{name}', 'id'), "
+                        f"COALESCE((SELECT MAX(id) FROM {name}), 0) + 1, false)"
+                    )
+                )
+
+    add_index(engine, get_index(table, "ix_archived_activities_source_id"))
@@ -1,6 +1,16 @@
 from datetime import datetime
 
-from sqlalchemy import JSON, Boolean, Column, DateTime, ForeignKey, Integer, String
+from sqlalchemy import (
+    JSON,
+    BigInteger,
+    Boolean,
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+)
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 
@@ -11,21 +21,25 @@ class Activity(Base):
     """Modèle pour les activités de guilde"""
 
     __tablename__ = "activities"
+    __table_args__ = (
+        # Sert le chargement des activités actives et la recherche des rappels
+        Index("ix_activities_active_event_date", "is_active", "event_date"),
+    )
 
     id = Column(Integer, primary_key=True)
-    message_id = Column(String, unique=True, nullable=False)
-    thread_id = Column(String, unique=True, nullable=False)
-    channel_id = Column(String, nullable=False)
-    guild_id = Column(String, nullable=False)
+    message_id = Column(BigInteger, unique=True, nullable=False)
+    thread_id = Column(BigInteger, unique=True, nullable=False)
+    channel_id = Column(BigInteger, nullable=False)
+    guild_id = Column(BigInteger, nullable=False)
 
     title = Column(String, nullable=False)
-    leader = Column(String, nullable=True)
+    leader = Column(BigInteger, nullable=True)
     event_date = Column(DateTime, nullable=False)
-    ping_role_id = Column(String, nullable=True)
+    ping_role_id = Column(BigInteger, nullable=True)
 
-    roles_config = Column(
-        JSON, nullable=False
-    )  # Structure: {role_name: {weapon: slots}}
+    # Liste ordonnée [[role_name, [[weapon, slots], ...]], ...] (voir SlotLayout) ;
+    # les anciennes lignes gardent la forme {role_name: {weapon: slots}}, toujours lue
+    roles_config = Column(JSON, nullable=False)
     reminders = Column(JSON, nullable=False)  # Liste des minutes avant event
     last_reminder_sent = Column(
         Integer, nullable=True
@@ -37,16 +51,29 @@ class Activity(Base):
     registrations = relationship(
         "Registration", back_populates="activity", cascade="all, delete-orphan"
     )
+    jobs = relationship(
+        "ScheduledJob", back_populates="activity", cascade="all, delete-orphan"
+    )
+    messages = relationship(
+        "ActivityMessage", back_populates="activity", cascade="all, delete-orphan"
+    )
 
 
 class Registration(Base):
     """Modèle pour les inscriptions aux activités"""
 
     __tablename__ = "registrations"
+    __table_args__ = (
+        # Arbitres des inscriptions concurrentes : un joueur par slot, un slot par joueur
+        Index(
+            "uq_registrations_activity_slot", "activity_id", "slot_number", unique=True
+        ),
+        Index("uq_registrations_activity_user", "activity_id", "user_id", unique=True),
+    )
 
     id = Column(Integer, primary_key=True)
     activity_id = Column(Integer, ForeignKey("activities.id"), nullable=False)
-    user_id = Column(String, nullable=False)
+    user_id = Column(BigInteger, nullable=False)
     role_name = Column(String, nullable=False)
     weapon = Column(String, nullable=False)
     slot_number = Column(Integer, nullable=False)
@@ -54,3 +81,93 @@ class Registration(Base):
     registered_at = Column(DateTime, default=datetime.utcnow)
 
     activity = relationship("Activity", back_populates="registrations")
+
+
+class ScheduledJob(Base):
+    """Modèle pour les échéances planifiées (rappels et démarrage)"""
+
+    __tablename__ = "scheduled_jobs"
+    __table_args__ = (
+        # Sert la requête de rattrapage : status = 'pending' AND fire_at <= now
+        Index("ix_scheduled_jobs_status_fire_at", "status", "fire_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    activity_id = Column(
+        Integer, ForeignKey("activities.id"), nullable=False, index=True
+    )
+    kind = Column(String, nullable=False)  # "reminder" ou "start"
+    minutes = Column(Integer, nullable=True)  # Minutes avant l'event (rappels)
+    fire_at = Column(DateTime, nullable=False)
+    status = Column(String, nullable=False, default="pending")  # pending, done, expired
+
+    activity = relationship("Activity", back_populates="jobs")
+
+
+class ActivityMessage(Base):
+    """Modèle pour les messages de suite d'un roster trop grand pour un seul embed"""
+
+    __tablename__ = "activity_messages"
+    __table_args__ = (
+        Index("uq_activity_messages_activity_page", "activity_id", "page", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True)
+    activity_id = Column(Integer, ForeignKey("activities.id"), nullable=False)
+    page = Column(Integer, nullable=False)  # La page 0 est Activity.message_id
+    message_id = Column(BigInteger, unique=True, nullable=False)
+
+    activity = relationship("Activity", back_populates="messages")
+
+
+class DmOptOut(Base):
+    """Modèle pour les joueurs qui refusent les rappels en message privé"""
+
+    __tablename__ = "dm_opt_outs"
+
+    user_id = Column(BigInteger, primary_key=True, autoincrement=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class ArchivedActivity(Base):
+    """Modèle pour les activités terminées, sorties des tables chaudes"""
+
+    __tablename__ = "archived_activities"
+    __table_args__ = (
+        # Historique d'un serveur par date
+        Index("ix_archived_activities_guild_event_date", "guild_id", "event_date"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    # Id d'origine dans activities (SQLite peut le réattribuer après archivage)
+    source_id = Column(Integer, nullable=False, index=True)
+    message_id = Column(BigInteger, nullable=False)
+    thread_id = Column(BigInteger, nullable=False)
+    channel_id = Column(BigInteger, nullable=False)
+    guild_id = Column(BigInteger, nullable=False)
+
+    title = Column(String, nullable=False)
+    leader = Column(BigInteger, nullable=True)
+    event_date = Column(DateTime, nullable=False)
+    ping_role_id = Column(BigInteger, nullable=True)
+    roles_config = Column(JSON, nullable=False)
+
+    created_at = Column(DateTime, nullable=True)
+    archived_at = Column(DateTime, nullable=False)
+
+
+class ArchivedRegistration(Base):
+    """Modèle pour les inscriptions des activités archivées"""
+
+    __tablename__ = "archived_registrations"
+
+    id = Column(Integer, primary_key=True)
+    activity_id = Column(
+        Integer, ForeignKey("archived_activities.id"), nullable=False, index=True
+    )
+    user_id = Column(BigInteger, nullable=False, index=True)  # Historique d'un joueur
+    role_name = Column(String, nullable=False)
+    weapon = Column(String, nullable=False)
+    slot_number = Column(Integer, nullable=False)
+
+    registered_at = Column(DateTime, nullable=True)
@@ -0,0 +1,168 @@
+from sqlalchemy import bindparam, delete, insert, select, update
+
+from database.models import Activity, ActivityMessage, Registration, ScheduledJob
+
+# Requêtes des chemins chauds, construites une seule fois au chargement du module :
+# SQLAlchemy mémorise leur clé de cache et réutilise le SQL compilé à chaque appel.
+# Elles passent par les tables (Core) : des tuples sont retournés, sans identité ORM.
+activities = Activity.__table__
+registrations = Registration.__table__
+activity_messages = ActivityMessage.__table__
+scheduled_jobs = ScheduledJob.__table__
+
+# Colonnes lues par ActivityState
+activity_state = select(
+    activities.c.id,
+    activities.c.message_id,
+    activities.c.thread_id,
+    activities.c.channel_id,
+    activities.c.guild_id,
+    activities.c.title,
+    activities.c.leader,
+    activities.c.event_date,
+    activities.c.ping_role_id,
+    activities.c.roles_config,
+)
+
+ACTIVITY_BY_THREAD = activity_state.where(
+    activities.c.thread_id == bindparam("thread_id")
+)
+ACTIVE_ACTIVITIES = activity_state.where(activities.c.is_active == True)
+
+ROSTER = select(registrations.c.slot_number, registrations.c.user_id).where(
+    registrations.c.activity_id == bindparam("activity_id")
+)
+ACTIVE_ROSTERS = (
+    select(
+        registrations.c.activity_id,
+        registrations.c.slot_number,
+        registrations.c.user_id,
+    )
+    .join(activities, registrations.c.activity_id == activities.c.id)
+    .where(activities.c.is_active == True)
+)
+REGISTERED_USERS = select(registrations.c.user_id).where(
+    registrations.c.activity_id == bindparam("activity_id")
+)
+
+PAGES = select(activity_messages.c.page, activity_messages.c.message_id).where(
+    activity_messages.c.activity_id == bindparam("activity_id")
+)
+ACTIVE_PAGES = (
+    select(
+        activity_messages.c.activity_id,
+        activity_messages.c.page,
+        activity_messages.c.message_id,
+    )
+    .join(activities, activity_messages.c.activity_id == activities.c.id)
+    .where(activities.c.is_active == True)
+)
+
+# Échéance et champs de l'activité utilisés par les rappels et le démarrage
+DEADLINE = (
+    select(
+        scheduled_jobs.c.id,
+        scheduled_jobs.c.kind,
+        scheduled_jobs.c.minutes,
+        scheduled_jobs.c.fire_at,
+        scheduled_jobs.c.activity_id,
+        activities.c.thread_id,
+        activities.c.title,
+        activities.c.leader,
+        activities.c.event_date,
+        activities.c.is_active,
+    )
+    .join(activities, scheduled_jobs.c.activity_id == activities.c.id)
+    .where(
+        scheduled_jobs.c.id == bindparam("job_id"),
+        scheduled_jobs.c.status == "pending",
+    )
+)
+# Rattrapage au démarrage et fenêtre chargée dans l'ordonnanceur (index status, fire_at)
+OVERDUE_JOBS = (
+    select(
+        scheduled_jobs.c.id,
+        scheduled_jobs.c.kind,
+        scheduled_jobs.c.fire_at,
+        scheduled_jobs.c.activity_id,
+        activities.c.is_active,
+        activities.c.event_date,
+    )
+    .join(activities, scheduled_jobs.c.activity_id == activities.c.id)
+    .where(
+        scheduled_jobs.c.status == "pending",
+        scheduled_jobs.c.fire_at < bindparam("now"),
+    )
+    .order_by(scheduled_jobs.c.fire_at)
+)
+JOBS_WINDOW = select(
+    scheduled_jobs.c.id, scheduled_jobs.c.fire_at, scheduled_jobs.c.activity_id
+).where(
+    scheduled_jobs.c.status == "pending",
+    scheduled_jobs.c.fire_at >= bindparam("since"),
+    scheduled_jobs.c.fire_at < bindparam("until"),
+)
+JOB_DONE = (
+    update(scheduled_jobs)
+    .where(scheduled_jobs.c.id == bindparam("job_id"))
+    .values(status="done")
+)
+
+# Écritures : une liste de paramètres est envoyée en une seule exécution groupée
+INSERT_REGISTRATIONS = insert(registrations)
+DELETE_REGISTRATIONS = delete(registrations).where(
+    registrations.c.activity_id == bindparam("activity_id"),
+    registrations.c.user_id == bindparam("user_id"),
+)
+INSERT_PAGE = insert(activity_messages)
+DELETE_PAGES_FROM = delete(activity_messages).where(
+    activity_messages.c.activity_id == bindparam("activity_id"),
+    activity_messages.c.page >= bindparam("page"),
+)
+
+# Suppression d'une activité : dépendances d'abord, sans charger les objets
+DELETE_ACTIVITY = tuple(
+    delete(table).where(column == bindparam("activity_id"))
+    for table, column in (
+        (registrations, registrations.c.activity_id),
+        (scheduled_jobs, scheduled_jobs.c.activity_id),
+        (activity_messages, activity_messages.c.activity_id),
+        (activities, activities.c.id),
+    )
+)
+
+
+class RegistrationWrites:
+    """Inscriptions et désinscriptions d'un lot, envoyées en deux requêtes groupées"""
+
+    def __init__(self):
+        self.inserts = {}  # (activity_id, user_id) -> ligne à insérer
+        self.deletes = []
+
+    def add(self, activity_id: int, user_id: int, role_name, weapon, slot: int):
+        self.inserts[(activity_id, user_id)] = {
+            "activity_id": activity_id,
+            "user_id": user_id,
+            "role_name": role_name,
+            "weapon": weapon,
+            "slot_number": slot,
+        }
+
+    def remove(self, activity_id: int, user_id: int):
+        # Inscription du même lot : elle n'atteint jamais la base
+        if self.inserts.pop((activity_id, user_id), None) is None:
+            self.deletes.append({"activity_id": activity_id, "user_id": user_id})
+
+    async def flush(self, session):
+        """Envoyer les écritures en attente (suppressions d'abord : slots libérés)"""
+        if self.deletes:
+            await session.execute(DELETE_REGISTRATIONS, self.deletes)
+        if self.inserts:
+            await session.execute(INSERT_REGISTRATIONS, list(self.inserts.values()))
+        self.inserts = {}
+        self.deletes = []
+
+
+def registration_writes(session) -> RegistrationWrites:
+    """Écritures d'inscriptions en attente dans la transaction de la session"""
+    return session.info.setdefault("registration_writes", RegistrationWrites())
@@ -0,0 +1,20 @@
+import contextvars
+import traceback
+from collections import Counter
+
+# Vrai tant que la tâche courante est dans une unité de travail (session ouverte)
+SESSION_OPEN = contextvars.ContextVar("session_open", default=False)
+
+# Appels réseau faits avec une session ouverte, par opération
+HELD_DURING_IO = Counter()
+
+
+def check_session_released(operation: str):
+    """Signaler un appel Discord fait alors que la tâche tient une connexion"""
+    if not SESSION_OPEN.get():
+        return
+    HELD_DURING_IO[operation] += 1
+    if HELD_DURING_IO[operation] == 1:
+        # Une pile par opération suffit à trouver l'appelant
+        stack = "".join(traceback.format_stack(limit=8)[:-1])
+        print(f"⚠️ Session ouverte pendant un appel Discord ({operation})\n{stack}")
@@ -0,0 +1,71 @@
+import asyncio
+from collections import deque
+
+
+class ActivityActors:
+    """Une boîte aux lettres par activité : les mutations sont appliquées dans l'ordre, par lots"""
+
+    def __init__(self, apply_batch, idle_timeout: float, max_batch: int = 50):
+        self.apply_batch = apply_batch  # Coroutine (activity_id, [(commande, future)])
+        self.idle_timeout = idle_timeout
+        self.max_batch = max_batch
+        self._mailboxes = {}  # activity_id -> deque de (commande, future)
+        self._wakeups = {}
+        self._tasks = {}
+
+    def __len__(self):
+        return len(self._tasks)
+
+    async def submit(self, activity_id, command):
+        """Déposer une commande et attendre son résultat"""
+        future = asyncio.get_running_loop().create_future()
+
+        mailbox = self._mailboxes.get(activity_id)
+        if mailbox is None:
+            mailbox = self._mailboxes[activity_id] = deque()
+            self._wakeups[activity_id] = asyncio.Event()
+            self._tasks[activity_id] = asyncio.create_task(self._run(activity_id))
+
+        mailbox.append((command, future))
+        self._wakeups[activity_id].set()
+        return await future
+
+    async def close(self):
+        """Arrêter les acteurs ; les commandes en attente échouent"""
+        for task in list(self._tasks.values()):
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+
+    async def _run(self, activity_id):
+        mailbox = self._mailboxes[activity_id]
+        wakeup = self._wakeups[activity_id]
+        try:
+            while True:
+                if not mailbox:
+                    # S'arrêter après une période sans commande
+                    wakeup.clear()
+                    try:
+                        await asyncio.wait_for(wakeup.wait(), self.idle_timeout)
+                    except asyncio.TimeoutError:
+                        if not mailbox:
+                            return
+                    continue
+
+                # Tout ce qui est arrivé pendant le lot précédent forme le lot suivant
+                batch = []
+                while mailbox and len(batch) < self.max_batch:
+                    batch.append(mailbox.popleft())
+
+                try:
+                    await self.apply_batch(activity_id, batch)
+                except Exception as e:
+                    for _, future in batch:
+                        if not future.done():
+                            future.set_exception(e)
+        finally:
+            for _, future in mailbox:
+                if not future.done():
+                    future.cancel()
+            del self._mailboxes[activity_id]
+            del self._wakeups[activity_id]
+            del self._tasks[activity_id]
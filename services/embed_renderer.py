@@ -0,0 +1,147 @@
+import hashlib
+import json
+from functools import lru_cache
+
+import discord
+
+ROLE_EMOJIS = {"Tank": "🛡️", "Healer": "💚", "DPS": "⚔️"}
+FOOTER = "💡 Utilisez /party join <slot> pour vous inscrire | /party leave pour partir"
+
+# Limites Discord des embeds
+FIELD_LIMIT = 1024
+EMBED_LIMIT = 6000
+MAX_FIELDS = 25
+TITLE_LIMIT = 256
+
+HEADER_FIELDS = 3  # Leader, date et séparateur de la première page
+HEADER_BUDGET = 128
+MENTION_WIDTH = len("<@>") + 20  # Un snowflake tient sur 20 chiffres au plus
+CONTINUATION = " (suite)"
+
+
+class EmbedRenderer:
+    """Rendu unique des embeds d'activité, avec cache par champ de rôle"""
+
+    def __init__(self, color: int):
+        self.color = color
+        self._fields = {}  # (activity_id, premier slot) -> (signature, texte rendu)
+        self._sent = {}  # activity_id -> {message_id: empreinte du dernier envoi}
+
+    def render(
+        self, activity_id, title, event_date, leader, layout, slot_to_user, page=0
+    ):
+        """Construire l'embed d'une page ; seuls les champs modifiés sont re-rendus"""
+        pages = paginate(layout)
+
+        if page == 0:
+            embed = discord.Embed(title=title, color=self.color)
+
+            # Leader
+            embed.add_field(
+                name="👑 Leader",
+                value=f"<@{leader}>" if leader else "—",
+                inline=True,
+            )
+
+            # Date & Heure
+            embed.add_field(
+                name="📅 Date & Heure",
+                value=event_date.strftime("%d/%m/%Y à %H:%M"),
+                inline=True,
+            )
+
+            embed.add_field(name="\u200b", value="\u200b", inline=True)
+        else:
+            suffix = f" ({page + 1}/{len(pages)})"
+            embed = discord.Embed(
+                title=title[: TITLE_LIMIT - len(suffix)] + suffix, color=self.color
+            )
+
+        # Affichage des slots par rôle
+        for name, first_slot, last_slot in pages[page]:
+            value = self.role_field(
+                activity_id, layout, first_slot, last_slot, slot_to_user
+            )
+            embed.add_field(name=name, value=value, inline=False)
+
+        embed.set_footer(text=FOOTER)
+        return embed
+
+    def role_field(self, activity_id, layout, first, last, slot_to_user):
+        # La signature (disposition + occupants) détermine entièrement le texte
+        occupants = tuple(slot_to_user.get(slot) for slot in range(first, last + 1))
+        signature = (layout, occupants)
+
+        cached = self._fields.get((activity_id, first))
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+        value = "\n".join(
+            f"{layout.label(slot)} - {f'<@{user}>' if user else '*Libre*'}"
+            for slot, user in zip(range(first, last + 1), occupants)
+        )
+        self._fields[(activity_id, first)] = (signature, value)
+        return value
+
+    @staticmethod
+    def digest(embed) -> str:
+        return hashlib.sha1(
+            json.dumps(embed.to_dict(), sort_keys=True).encode()
+        ).hexdigest()
+
+    def changed(self, activity_id, message_id, embed):
+        """Empreinte de l'embed s'il diffère du dernier envoyé, sinon None"""
+        digest = self.digest(embed)
+        if self._sent.get(activity_id, {}).get(message_id) == digest:
+            return None
+        return digest
+
+    def mark_sent(self, activity_id, message_id, digest):
+        self._sent.setdefault(activity_id, {})[message_id] = digest
+
+    def forget(self, activity_id):
+        """Oublier une activité supprimée"""
+        self._sent.pop(activity_id, None)
+        for key in [key for key in self._fields if key[0] == activity_id]:
+            del self._fields[key]
+
+
+def line_width(layout, slot: int) -> int:
+    # Pire cas : une mention de snowflake à 20 chiffres, plus le saut de ligne
+    return len(layout.label(slot)) + len(" - ") + MENTION_WIDTH + 1
+
+
+@lru_cache(maxsize=256)
+def paginate(layout) -> tuple:
+    """Découper les rôles en champs et en pages : ((nom, premier, dernier), ...) par page"""
+    # Calculé sur la largeur maximale des lignes : un slot ne change jamais de page
+    # quand des joueurs s'inscrivent, seule sa page est ré-éditée
+    budget = EMBED_LIMIT - TITLE_LIMIT - len(FOOTER)
+    pages = [[]]
+    size = HEADER_BUDGET
+    fields = HEADER_FIELDS
+
+    for role_name, first_slot, last_slot in layout.role_slots:
+        name = f"{ROLE_EMOJIS.get(role_name, '🔹')} {role_name}"
+
+        # Champs de rôle limités à 1024 caractères, suivis de champs "(suite)"
+        chunks = []
+        start, width = first_slot, 0
+        for slot in range(first_slot, last_slot + 1):
+            if width + line_width(layout, slot) > FIELD_LIMIT:
+                chunks.append((start, slot - 1, width))
+                start, width = slot, 0
+            width += line_width(layout, slot)
+        chunks.append((start, last_slot, width))
+
+        for index, (first, last, width) in enumerate(chunks):
+            field_name = name + CONTINUATION if index else name
+            cost = len(field_name) + width
+            if pages[-1] and (size + cost > budget or fields >= MAX_FIELDS):
+                pages.append([])
+                size, fields = 0, 0
+            pages[-1].append((field_name, first, last))
+            size += cost
+            fields += 1
+
+    return tuple(tuple(page) for page in pages)
@@ -0,0 +1,73 @@
+import asyncio
+
+
+class EmbedUpdater:
+    """Regroupe les mises à jour d'embed : au plus une édition par fenêtre et par activité"""
+
+    MAX_RETRIES = 3
+
+    def __init__(self, flush, window: float):
+        self.flush = flush  # Coroutine appelée avec l'id de l'activité à re-rendre
+        self.window = window
+        self._dirty = set()
+        self._tasks = {}  # activity_id -> tâche de flush en cours
+        self._last_flush = {}  # activity_id -> instant du dernier flush
+        self._failures = {}
+
+    def mark_dirty(self, activity_id):
+        """Signaler qu'une activité a changé ; l'édition sera regroupée"""
+        self._dirty.add(activity_id)
+        if activity_id not in self._tasks:
+            self._tasks[activity_id] = asyncio.create_task(self._run(activity_id))
+
+    def forget(self, activity_id):
+        """Oublier une activité supprimée"""
+        self._dirty.discard(activity_id)
+        self._last_flush.pop(activity_id, None)
+        self._failures.pop(activity_id, None)
+        task = self._tasks.pop(activity_id, None)
+        if task is not None:
+            task.cancel()
+
+    async def flush_all(self):
+        """Appliquer immédiatement toutes les éditions en attente"""
+        for task in list(self._tasks.values()):
+            task.cancel()
+        self._tasks.clear()
+
+        pending = list(self._dirty)
+        self._dirty.clear()
+        await asyncio.gather(
+            *(self.flush(activity_id) for activity_id in pending),
+            return_exceptions=True,
+        )
+
+    async def _run(self, activity_id):
+        loop = asyncio.get_running_loop()
+        try:
+            # Tant que l'activité est marquée, on re-rend son état le plus récent
+            while activity_id in self._dirty:
+                last = self._last_flush.get(activity_id)
+                if last is not None:
+                    delay = last + self.window - loop.time()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+
+                self._dirty.discard(activity_id)
+                self._last_flush[activity_id] = loop.time()
+
+                try:
+                    await self.flush(activity_id)
+                    self._failures.pop(activity_id, None)
+                except Exception as e:
+                    print(f"❌ Erreur mise à jour embed (activité {activity_id}): {e}")
+                    failures = self._failures.get(activity_id, 0) + 1
+                    if failures < self.MAX_RETRIES:
+                        # Réessayer à la fenêtre suivante pour que le dernier état arrive
+                        self._failures[activity_id] = failures
+                        self._dirty.add(activity_id)
+                    else:
+                        self._failures.pop(activity_id, None)
+        finally:
+            if self._tasks.get(activity_id) is asyncio.current_task():
+                del self._tasks[activity_id]
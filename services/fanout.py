@@ -0,0 +1,106 @@
+import asyncio
+from collections import deque
+
+import discord
+
+from services.outbound import URGENT
+
+MESSAGE_LIMIT = 2000
+
+
+def chunk_mentions(header: str, mentions, limit: int = MESSAGE_LIMIT) -> list:
+    """Répartir les mentions en messages valides : l'en-tête ouvre le premier"""
+    messages = []
+    current = header
+    separator = "\n"
+    for mention in mentions:
+        if len(current) + len(separator) + len(mention) > limit:
+            messages.append(current)
+            current, separator = mention, " "
+            continue
+        current += separator + mention
+        separator = " "
+    messages.append(current)
+    return messages
+
+
+def send_in_order(channel, messages):
+    """Fabrique d'envoi des messages un à un ; une reprise repart du premier non envoyé"""
+    remaining = deque(messages)
+
+    async def send():
+        while remaining:
+            await channel.send(remaining[0])
+            remaining.popleft()
+
+    return send
+
+
+class FanOut:
+    """Diffusion des rappels : mentions découpées, DMs optionnels, concurrence bornée"""
+
+    DM_RETRIES = 3
+
+    def __init__(
+        self, bot, outbound, concurrency: int, dm_enabled: bool, dm_concurrency: int
+    ):
+        self.bot = bot
+        self.outbound = outbound
+        self.dm_enabled = dm_enabled
+        self.semaphore = asyncio.Semaphore(concurrency)  # Diffusions simultanées
+        self._dm_semaphore = asyncio.Semaphore(dm_concurrency)
+        self.opt_outs = set()  # Joueurs qui refusent les DMs
+        self.timings = deque(maxlen=100)  # (libellé, secondes, messages, DMs remis)
+
+    async def notify(self, channel, header: str, user_ids, label: str):
+        """Annoncer dans un salon en mentionnant les joueurs, puis en DM si activé"""
+        loop = asyncio.get_running_loop()
+        async with self.semaphore:
+            started = loop.time()
+
+            messages = chunk_mentions(header, [f"<@{user_id}>" for user_id in user_ids])
+            # Un seul envoi en file pour tous les morceaux : ils partent dans l'ordre
+            sends = [
+                self.outbound.submit(
+                    channel.id, URGENT, send_in_order(channel, messages)
+                )
+            ]
+
+            dms = []
+            if self.dm_enabled:
+                dm_content = f"{header}\n💬 {channel.mention}"
+                dms = [
+                    self.send_dm(user_id, dm_content)
+                    for user_id in user_ids
+                    if user_id not in self.opt_outs
+                ]
+
+            results = await asyncio.gather(*sends, *dms, return_exceptions=True)
+            delivered = sum(1 for result in results[len(sends) :] if result is True)
+
+            elapsed = loop.time() - started
+            self.timings.append((label, elapsed, len(messages), delivered))
+            print(
+                f"📣 {label} : {len(messages)} message(s), "
+                f"{delivered}/{len(dms)} DM en {elapsed:.2f}s"
+            )
+
+    async def send_dm(self, user_id: int, content: str) -> bool:
+        """Envoyer un DM avec reprise exponentielle ; False si impossible"""
+        for attempt in range(self.DM_RETRIES):
+            try:
+                user = self.bot.get_user(user_id) or await self.bot.fetch_user(user_id)
+                async with self._dm_semaphore:
+                    await user.send(content)
+                return True
+            except (discord.Forbidden, discord.NotFound):
+                # DMs fermés ou joueur inconnu : inutile de réessayer
+                return False
+            except discord.RateLimited as e:
+                await asyncio.sleep(e.retry_after)
+            except discord.HTTPException as e:
+                # Seules les erreurs serveur sont passagères
+                if e.status < 500:
+                    return False
+                await asyncio.sleep(2**attempt)
+        return False
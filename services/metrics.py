@@ -0,0 +1,292 @@
+import asyncio
+import logging
+import time
+from bisect import bisect_left
+
+import discord
+from aiohttp import web
+from sqlalchemy import event
+
+from database.session_guard import check_session_released
+
+# Bornes des histogrammes (secondes)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LAG_BUCKETS = (0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0, 900.0, 3600.0)
+
+# Familles connues : nom -> (type, aide, bornes des histogrammes)
+FAMILIES = {
+    "hrzn_command_seconds": (
+        "histogram",
+        "Latence des commandes /party par phase (defer, followup, total)",
+        LATENCY_BUCKETS,
+    ),
+    "hrzn_commands_total": ("counter", "Commandes /party exécutées, par issue", None),
+    "hrzn_db_statement_seconds": (
+        "histogram",
+        "Durée des requêtes SQL, par verbe",
+        LATENCY_BUCKETS,
+    ),
+    "hrzn_db_errors_total": ("counter", "Requêtes SQL en erreur, par verbe", None),
+    "hrzn_discord_rest_seconds": (
+        "histogram",
+        "Durée des appels REST Discord, par méthode et route",
+        LATENCY_BUCKETS,
+    ),
+    "hrzn_discord_rest_requests_total": (
+        "counter",
+        "Appels REST Discord, par méthode, route et statut",
+        None,
+    ),
+    "hrzn_discord_rate_limited_total": (
+        "counter",
+        "Réponses 429 de Discord (attendues par discord.py ou remontées)",
+        None,
+    ),
+    "hrzn_event_loop_lag_seconds": (
+        "histogram",
+        "Retard de la boucle asyncio (mesuré par le watchdog)",
+        LATENCY_BUCKETS,
+    ),
+    "hrzn_event_loop_stalls_total": (
+        "counter",
+        "Blocages de la boucle au-delà du seuil, par commande active",
+        None,
+    ),
+    "hrzn_reminder_lag_seconds": (
+        "histogram",
+        "Retard des échéances : déclenchement réel moins heure prévue",
+        LAG_BUCKETS,
+    ),
+}
+
+
+def label_key(labels: dict) -> tuple:
+    return tuple(sorted(labels.items()))
+
+
+def escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(key: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{escape(value)}"' for name, value in key]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def format_value(value: float) -> str:
+    if value != value:
+        return "NaN"
+    if value in (float("inf"), float("-inf")):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        index = bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    """Compteurs et histogrammes du bot, exposés au format texte Prometheus"""
+
+    def __init__(self):
+        self._series = {name: {} for name in FAMILIES}  # nom -> {labels: valeur}
+        self._collectors = {}  # nom -> (type, aide, fonction lue au rendu)
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        series = self._series[name]
+        key = label_key(labels)
+        series[key] = series.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        series = self._series[name]
+        key = label_key(labels)
+        histogram = series.get(key)
+        if histogram is None:
+            histogram = series[key] = Histogram(FAMILIES[name][2])
+        histogram.observe(value)
+
+    def collector(self, name: str, kind: str, help: str, func):
+        """Valeur calculée à chaque lecture : un nombre ou une liste (labels, valeur)"""
+        self._collectors[name] = (kind, help, func)
+
+    def render(self) -> str:
+        lines = []
+        for name, (kind, help, _) in FAMILIES.items():
+            lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+            for key, value in self._series[name].items():
+                if kind != "histogram":
+                    lines.append(f"{name}{format_labels(key)} {format_value(value)}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(value.buckets, value.counts):
+                    cumulative += count
+                    bucket = format_labels(key, f'le="{bound}"')
+                    lines.append(f"{name}_bucket{bucket} {cumulative}")
+                bucket = format_labels(key, 'le="+Inf"')
+                lines.append(f"{name}_bucket{bucket} {value.count}")
+                lines.append(f"{name}_sum{format_labels(key)} {repr(value.sum)}")
+                lines.append(f"{name}_count{format_labels(key)} {value.count}")
+
+        for name, (kind, help, func) in self._collectors.items():
+            lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+            try:
+                value = func()
+            except Exception as e:
+                print(f"❌ Erreur de lecture de la métrique {name}: {e}")
+                continue
+            samples = value if isinstance(value, list) else [({}, value)]
+            for labels, sample in samples:
+                key = label_key(labels)
+                lines.append(f"{name}{format_labels(key)} {format_value(sample)}")
+        return "\n".join(lines) + "\n"
+
+    def instrument_database(self, db):
+        """Mesurer les requêtes SQL des moteurs de la base (événements SQLAlchemy)"""
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+            conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+        def after_cursor_execute(conn, cursor, statement, parameters, context, many):
+            started = conn.info["query_started"].pop()
+            self.observe(
+                "hrzn_db_statement_seconds",
+                time.perf_counter() - started,
+                verb=statement.split(None, 1)[0].upper(),
+            )
+
+        def handle_error(context):
+            stack = (
+                context.connection.info.get("query_started")
+                if context.connection
+                else None
+            )
+            if stack:
+                stack.pop()
+            statement = context.statement or "?"
+            self.inc("hrzn_db_errors_total", verb=statement.split(None, 1)[0].upper())
+
+        # db.engine est aussi la face synchrone du moteur asynchrone
+        event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+        event.listen(db.engine, "after_cursor_execute", after_cursor_execute)
+        event.listen(db.engine, "handle_error", handle_error)
+
+    def instrument_http(self, http):
+        """Compter et chronométrer les appels REST du client discord.py"""
+        request = http.request
+
+        async def timed_request(route, **kwargs):
+            check_session_released(f"{route.method} {route.path}")
+            started = time.perf_counter()
+            status = "ok"
+            try:
+                return await request(route, **kwargs)
+            except discord.RateLimited:
+                status = "429"
+                raise
+            except discord.HTTPException as e:
+                status = str(e.status)
+                raise
+            except Exception:
+                status = "error"
+                raise
+            finally:
+                # Le gabarit de route (sans ids) borne la cardinalité
+                self.observe(
+                    "hrzn_discord_rest_seconds",
+                    time.perf_counter() - started,
+                    method=route.method,
+                    route=route.path,
+                )
+                self.inc(
+                    "hrzn_discord_rest_requests_total",
+                    method=route.method,
+                    route=route.path,
+                    status=status,
+                )
+
+        http.request = timed_request
+
+        # Les 429 attendus en interne par discord.py ne sont visibles que dans ses logs
+        logging.getLogger("discord.http").addHandler(RateLimitLogHandler(self))
+
+
+class RateLimitLogHandler(logging.Handler):
+    """Compter une fois chaque réponse 429 signalée par discord.http"""
+
+    # discord.py journalise « responded with 429 » pour toute 429, puis, sans
+    # await entre les deux, « Global rate limit » si elle est globale : la 429
+    # n'est classée qu'au tour de boucle suivant, une fois ce second message passé
+
+    def __init__(self, metrics):
+        super().__init__(logging.WARNING)
+        self.metrics = metrics
+        self._pending = None  # Portée de la dernière 429 pas encore comptée
+
+    def emit(self, record):
+        message = str(record.msg)
+        if "Global rate limit" in message:
+            if self._pending is not None:
+                self._pending = "global"
+        elif "429" in message:
+            # Une 429 d'une autre tâche : la précédente est déjà complète
+            self.flush()
+            self._pending = "bucket"
+            try:
+                asyncio.get_running_loop().call_soon(self.flush)
+            except RuntimeError:
+                self.flush()
+
+    def flush(self):
+        scope, self._pending = self._pending, None
+        if scope is not None:
+            self.metrics.inc("hrzn_discord_rate_limited_total", scope=scope)
+
+
+class MetricsServer:
+    """Serveur HTTP local : /metrics (Prometheus) et /ready (sonde de disponibilité)"""
+
+    def __init__(self, metrics, ready, host: str, port: int):
+        self.metrics = metrics
+        self.ready = ready  # Fonction sans argument : True si le bot répond
+        self.host = host
+        self.port = port
+        self._runner = None
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/metrics", self.handle_metrics)
+        app.router.add_get("/ready", self.handle_ready)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        print(f"📈 Métriques exposées sur http://{self.host}:{self.port}/metrics")
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def handle_metrics(self, request):
+        return web.Response(
+            text=self.metrics.render(), content_type="text/plain", charset="utf-8"
+        )
+
+    async def handle_ready(self, request):
+        if self.ready():
+            return web.Response(text="ok\n")
+        return web.Response(status=503, text="not ready\n")
@@ -0,0 +1,253 @@
+import asyncio
+import heapq
+import itertools
+
+import discord
+
+from database.session_guard import check_session_released
+
+# Classes de priorité : la plus petite passe en premier
+URGENT = 0  # Rappels, MASS UP
+NORMAL = 1  # Création et suppression d'activités
+COSMETIC = 2  # Éditions d'embed
+
+PRIORITY_NAMES = {URGENT: "urgent", NORMAL: "normal", COSMETIC: "cosmetic"}
+
+
+class TokenBucket:
+    """Seau de jetons d'un salon, pénalisé par les 429 de Discord"""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated", "blocked_until")
+
+    def __init__(self, capacity: int, per: float, now: float):
+        self.rate = capacity / per
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = now
+        self.blocked_until = now
+
+    def delay(self, now: float) -> float:
+        """Secondes avant qu'un jeton soit disponible"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+    def penalize(self, now: float, retry_after: float):
+        # Discord a indiqué le délai du seau : rien ne part avant
+        self.tokens = 0.0
+        self.updated = now
+        self.blocked_until = max(self.blocked_until, now + retry_after)
+
+
+class OutboundJob:
+    __slots__ = ("priority", "seq", "channel_id", "key", "factory", "future", "queued")
+
+    def __init__(self, priority, seq, channel_id, key, factory, future, queued):
+        self.priority = priority
+        self.seq = seq
+        self.channel_id = channel_id
+        self.key = key
+        self.factory = factory
+        self.future = future
+        self.queued = queued
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class OutboundQueue:
+    """File centrale des envois Discord : priorités, seaux par salon, concurrence bornée"""
+
+    def __init__(self, concurrency: int, bucket_size: int = 5, bucket_per: float = 5.0):
+        self.bucket_size = bucket_size
+        self.bucket_per = bucket_per
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._pending = []  # Tas de OutboundJob prêts à être examinés
+        self._parked = (
+            {}
+        )  # salon -> [instant de reprise, jobs] : seau vide, hors du tas
+        self._after_inflight = {}  # clé -> job attendant la fin de l'envoi de même clé
+        self._keyed = {}  # clé -> job en attente (fusionné avec les suivants)
+        self._inflight = set()  # Clés en cours d'envoi : une seule à la fois
+        self._buckets = {}
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self.metrics = {
+            "sent": 0,
+            "failed": 0,
+            "rate_limited": 0,
+            "coalesced": 0,
+            "wait_total": 0.0,
+            "wait_max": 0.0,
+        }
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Arrêter le répartiteur ; les envois en cours se terminent"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def depth(self) -> dict:
+        """Nombre d'envois en attente par classe de priorité"""
+        depth = {name: 0 for name in PRIORITY_NAMES.values()}
+        for job in self._queued():
+            depth[PRIORITY_NAMES[job.priority]] += 1
+        return depth
+
+    def _queued(self):
+        yield from self._pending
+        for _, jobs in self._parked.values():
+            yield from jobs
+        yield from self._after_inflight.values()
+
+    def snapshot(self) -> dict:
+        """Profondeur de file et temps d'attente, pour le suivi"""
+        attempts = (
+            self.metrics["sent"] + self.metrics["failed"] + self.metrics["rate_limited"]
+        )
+        return {
+            **self.metrics,
+            "depth": self.depth(),
+            "wait_avg": self.metrics["wait_total"] / attempts if attempts else 0.0,
+        }
+
+    def submit(self, channel_id: int, priority: int, factory, key=None):
+        """Mettre un envoi en file ; retourne un future (inutile de l'attendre)"""
+        # factory : fonction sans argument qui retourne la coroutine d'envoi.
+        # Un envoi à clé en attente est remplacé par le plus récent (ex: édition d'embed)
+        check_session_released("file d'envoi")
+        pending = self._keyed.get(key) if key is not None else None
+        if pending is not None:
+            pending.factory = factory
+            self.metrics["coalesced"] += 1
+            return pending.future
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        # Les erreurs sont journalisées : un future non attendu ne doit pas avertir
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        job = OutboundJob(
+            priority, next(self._seq), channel_id, key, factory, future, loop.time()
+        )
+        heapq.heappush(self._pending, job)
+        if key is not None:
+            self._keyed[key] = job
+        self._wakeup.set()
+        return future
+
+    def _bucket(self, channel_id, now):
+        bucket = self._buckets.get(channel_id)
+        if bucket is None:
+            bucket = self._buckets[channel_id] = TokenBucket(
+                self.bucket_size, self.bucket_per, now
+            )
+        return bucket
+
+    def _next_job(self, now):
+        """Premier job (par priorité) dont le salon a un jeton ; sinon l'attente minimale"""
+        # Les jobs bloqués sortent du tas (par salon ou par clé) au lieu d'être
+        # réexaminés à chaque envoi : ils y reviennent quand leur obstacle disparaît
+        self._unpark(now)
+        while self._pending:
+            job = heapq.heappop(self._pending)
+            if job.key is not None and job.key in self._inflight:
+                self._after_inflight[job.key] = job
+                continue
+
+            parked = self._parked.get(job.channel_id)
+            if parked is not None:
+                parked[1].append(job)
+                continue
+
+            delay = self._bucket(job.channel_id, now).delay(now)
+            if delay <= 0:
+                return job, None
+            self._parked[job.channel_id] = [now + delay, [job]]
+
+        if not self._parked:
+            return None, None
+        return None, max(min(ready for ready, _ in self._parked.values()) - now, 0)
+
+    def _unpark(self, now):
+        # Salons dont le seau a dû se remplir : leurs jobs retournent dans le tas
+        for channel_id, (ready, jobs) in list(self._parked.items()):
+            if ready <= now:
+                del self._parked[channel_id]
+                for job in jobs:
+                    heapq.heappush(self._pending, job)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._semaphore.acquire()
+
+            job = None
+            while job is None:
+                self._wakeup.clear()
+                job, wait = self._next_job(loop.time())
+                if job is None:
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), wait)
+                    except asyncio.TimeoutError:
+                        pass
+
+            if job.key is not None:
+                del self._keyed[job.key]
+                self._inflight.add(job.key)
+
+            self._bucket(job.channel_id, loop.time()).take()
+            asyncio.create_task(self._send(job))
+
+    async def _send(self, job):
+        loop = asyncio.get_running_loop()
+        waited = loop.time() - job.queued
+        self.metrics["wait_total"] += waited
+        self.metrics["wait_max"] = max(self.metrics["wait_max"], waited)
+
+        try:
+            result = await job.factory()
+        except discord.RateLimited as e:
+            # 429 au-delà de max_ratelimit_timeout : pénaliser le seau et remettre en file
+            self.metrics["rate_limited"] += 1
+            self._bucket(job.channel_id, loop.time()).penalize(
+                loop.time(), e.retry_after
+            )
+            self._requeue(job)
+        except Exception as e:
+            self.metrics["failed"] += 1
+            print(f"❌ Erreur d'envoi Discord (salon {job.channel_id}): {e}")
+            if not job.future.done():
+                job.future.set_exception(e)
+        else:
+            self.metrics["sent"] += 1
+            if not job.future.done():
+                job.future.set_result(result)
+        finally:
+            if job.key is not None:
+                self._inflight.discard(job.key)
+                waiting = self._after_inflight.pop(job.key, None)
+                if waiting is not None:
+                    heapq.heappush(self._pending, waiting)
+            self._semaphore.release()
+            self._wakeup.set()
+
+    def _requeue(self, job):
+        # Un envoi plus récent de même clé l'a remplacé entre-temps
+        if job.key is not None and job.key in self._keyed:
+            job.future.set_result(None)
+            return
+        heapq.heappush(self._pending, job)
+        if job.key is not None:
+            self._keyed[job.key] = job
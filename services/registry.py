@@ -0,0 +1,203 @@
+from bisect import bisect_left, insort
+
+from database import queries
+from services.slot_layout import SlotLayout
+
+
+class ActivityState:
+    """État compact d'une activité et de son roster (ids Discord en int)"""
+
+    __slots__ = (
+        "id",
+        "message_id",
+        "pages",
+        "thread_id",
+        "channel_id",
+        "guild_id",
+        "title",
+        "leader",
+        "event_date",
+        "ping_role_id",
+        "layout",
+        "slot_to_user",
+        "user_to_slot",
+        "free",
+    )
+
+    def __init__(self, activity):
+        self.id = activity.id
+        self.message_id = activity.message_id
+        self.pages = [self.message_id]  # message_id de chaque page du roster
+        self.thread_id = activity.thread_id
+        self.channel_id = activity.channel_id
+        self.guild_id = activity.guild_id
+        self.slot_to_user = {}
+        self.user_to_slot = {}
+        self.free = []  # Slots libres triés, pour l'autocomplétion
+        self.update_from(activity)
+
+    def update_from(self, activity):
+        """Recopier les champs modifiables d'une activité"""
+        self.title = activity.title
+        self.leader = activity.leader
+        self.event_date = activity.event_date
+        self.ping_role_id = activity.ping_role_id
+        self.layout = SlotLayout.from_config(activity.roles_config)
+        self.rebuild_free()
+
+    def rebuild_free(self):
+        self.free = [
+            slot
+            for slot in range(1, self.layout.total + 1)
+            if slot not in self.slot_to_user
+        ]
+
+    def assign(self, slot: int, user_id: int):
+        self.slot_to_user[slot] = user_id
+        self.user_to_slot[user_id] = slot
+        index = bisect_left(self.free, slot)
+        if index < len(self.free) and self.free[index] == slot:
+            del self.free[index]
+
+    def release_user(self, user_id: int):
+        """Libérer le slot d'un joueur ; retourne le slot libéré"""
+        slot = self.user_to_slot.pop(user_id, None)
+        if slot is not None:
+            self.slot_to_user.pop(slot, None)
+            if slot <= self.layout.total:
+                insort(self.free, slot)
+        return slot
+
+    def free_slots(self, query: str = "", limit: int = 25) -> list:
+        """Slots libres (slot, rôle, arme) filtrés par début de numéro, rôle ou arme"""
+        query = query.strip().lower()
+        matches = []
+        for slot in self.free:
+            role_name, weapon = self.layout.resolve(slot)
+            if (
+                not query
+                or str(slot).startswith(query)
+                or query in role_name.lower()
+                or query in weapon.lower()
+            ):
+                matches.append((slot, role_name, weapon))
+                if len(matches) == limit:
+                    break
+        return matches
+
+    def set_pages(self, messages):
+        """Remplacer les pages de suite à partir des messages en base"""
+        self.pages = [self.message_id]
+        for message in sorted(messages, key=lambda message: message.page):
+            self.pages.append(message.message_id)
+
+    def snapshot(self) -> tuple:
+        """Copie des champs modifiables, pour annuler un lot de commandes échoué"""
+        return (
+            self.title,
+            self.leader,
+            self.event_date,
+            self.ping_role_id,
+            self.layout,
+            dict(self.slot_to_user),
+            dict(self.user_to_slot),
+            list(self.free),
+            list(self.pages),
+        )
+
+    def restore(self, snapshot: tuple):
+        (
+            self.title,
+            self.leader,
+            self.event_date,
+            self.ping_role_id,
+            self.layout,
+            self.slot_to_user,
+            self.user_to_slot,
+            self.free,
+            self.pages,
+        ) = snapshot
+
+    def set_roster(self, registrations):
+        """Remplacer le roster à partir d'inscriptions en base"""
+        self.slot_to_user.clear()
+        self.user_to_slot.clear()
+        for reg in registrations:
+            self.slot_to_user[reg.slot_number] = reg.user_id
+            self.user_to_slot[reg.user_id] = reg.slot_number
+        self.rebuild_free()
+
+
+class ActivityRegistry:
+    """Index en mémoire des activités par id, thread_id et message_id"""
+
+    def __init__(self):
+        self.by_id = {}
+        self.by_thread = {}
+        self.by_message = {}
+
+    def __len__(self):
+        return len(self.by_id)
+
+    async def hydrate(self, session):
+        """Charger les activités actives, leurs inscriptions et leurs pages"""
+        for activity in await session.execute(queries.ACTIVE_ACTIVITIES):
+            self.put(activity)
+
+        for reg in await session.execute(queries.ACTIVE_ROSTERS):
+            self.by_id[reg.activity_id].assign(reg.slot_number, reg.user_id)
+
+        pages = {}
+        for message in await session.execute(queries.ACTIVE_PAGES):
+            pages.setdefault(message.activity_id, []).append(message)
+        for activity_id, activity_messages in pages.items():
+            self.by_id[activity_id].set_pages(activity_messages)
+
+    async def load(self, session, thread_id: int):
+        """Charger depuis la base une activité absente du registre (ex: terminée)"""
+        activity = (
+            await session.execute(queries.ACTIVITY_BY_THREAD, {"thread_id": thread_id})
+        ).first()
+        if not activity:
+            return None
+
+        params = {"activity_id": activity.id}
+        registrations = await session.execute(queries.ROSTER, params)
+        state = self.put(activity, registrations)
+        state.set_pages(await session.execute(queries.PAGES, params))
+        return state
+
+    def put(self, activity, registrations=None):
+        """Ajouter ou rafraîchir une activité ; remplace le roster si fourni"""
+        state = self.by_id.get(activity.id)
+        if state is None:
+            state = self.add(ActivityState(activity))
+        else:
+            state.update_from(activity)
+
+        if registrations is not None:
+            state.set_roster(registrations)
+        return state
+
+    def add(self, state):
+        """Indexer un état existant (ex: activité restaurée après un lot annulé)"""
+        self.by_id[state.id] = state
+        self.by_thread[state.thread_id] = state
+        self.by_message[state.message_id] = state
+        return state
+
+    def get(self, activity_id: int):
+        return self.by_id.get(activity_id)
+
+    def get_by_thread(self, thread_id: int):
+        return self.by_thread.get(thread_id)
+
+    def get_by_message(self, message_id: int):
+        return self.by_message.get(message_id)
+
+    def remove(self, activity_id: int):
+        state = self.by_id.pop(activity_id, None)
+        if state is not None:
+            self.by_thread.pop(state.thread_id, None)
+            self.by_message.pop(state.message_id, None)
+        return state
@@ -0,0 +1,109 @@
+import asyncio
+import heapq
+import itertools
+from datetime import datetime
+
+
+class DeadlineScheduler:
+    """Ordonnanceur à échéances : un tas min trié par heure de déclenchement"""
+
+    def __init__(self, callback):
+        self.callback = callback  # Coroutine appelée avec la clé de l'échéance
+        self._heap = []  # (fire_at, seq, key)
+        self._entries = {}  # key -> (fire_at, seq, group)
+        self._groups = {}  # group -> {keys}
+        self._counter = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._running = set()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def next_deadline(self):
+        """Prochaine échéance valide (ou None)"""
+        self._purge()
+        return self._heap[0][0] if self._heap else None
+
+    def schedule(self, key, fire_at: datetime, group=None):
+        """Planifier (ou re-planifier) une échéance"""
+        self.cancel(key)
+
+        seq = next(self._counter)
+        self._entries[key] = (fire_at, seq, group)
+        self._groups.setdefault(group, set()).add(key)
+        heapq.heappush(self._heap, (fire_at, seq, key))
+
+        # Réveiller la boucle si la nouvelle échéance est la plus proche
+        if self._heap[0][1] == seq:
+            self._wakeup.set()
+
+    def cancel(self, key):
+        """Annuler une échéance (retirée paresseusement du tas)"""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+
+        keys = self._groups.get(entry[2])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._groups[entry[2]]
+
+    def cancel_group(self, group):
+        """Annuler toutes les échéances d'un groupe (ex: une activité)"""
+        for key in self._groups.pop(group, set()):
+            self._entries.pop(key, None)
+
+    def _purge(self):
+        # Supprimer du sommet du tas les entrées annulées ou re-planifiées
+        while self._heap:
+            fire_at, seq, key = self._heap[0]
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] == seq:
+                return
+            heapq.heappop(self._heap)
+
+    async def _run(self):
+        while True:
+            self._purge()
+
+            if not self._heap:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            fire_at, seq, key = self._heap[0]
+            delay = (fire_at - datetime.now()).total_seconds()
+
+            if delay > 0:
+                # Dormir jusqu'à l'échéance, ou jusqu'à une échéance plus proche
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(self._heap)
+            self.cancel(key)
+
+            # Les échéances simultanées sont traitées en parallèle
+            task = asyncio.create_task(self._fire(key))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _fire(self, key):
+        try:
+            await self.callback(key)
+        except Exception as e:
+            print(f"❌ Erreur lors de l'échéance {key}: {e}")
@@ -0,0 +1,108 @@
+from bisect import bisect_right
+from functools import lru_cache
+
+
+class SlotLayout:
+    """Disposition compilée et immuable des slots d'une configuration de rôles"""
+
+    __slots__ = ("roles", "blocks", "starts", "labels", "role_slots", "total")
+
+    def __init__(self, roles: tuple):
+        # roles : ((role_name, ((weapon, count), ...)), ...) dans l'ordre d'affichage
+        self.roles = roles
+
+        blocks = []  # (premier slot, rôle, arme, nombre)
+        role_slots = []  # (rôle, premier slot, dernier slot)
+        labels = []
+        slot = 1
+        for role_name, weapons in roles:
+            first = slot
+            for weapon, count in weapons:
+                blocks.append((slot, role_name, weapon, count))
+                labels.extend(f"`{n}.` {weapon}" for n in range(slot, slot + count))
+                slot += count
+            role_slots.append((role_name, first, slot - 1))
+
+        self.blocks = tuple(blocks)
+        self.starts = tuple(block[0] for block in blocks)  # Sommes préfixes
+        self.labels = tuple(labels)
+        self.role_slots = tuple(role_slots)
+        self.total = slot - 1
+
+    @classmethod
+    def from_config(cls, config):
+        """Compiler une config stockée (liste ordonnée, ou ancien format dict)"""
+        if isinstance(config, dict):
+            roles = tuple(
+                (
+                    role_name,
+                    tuple((weapon, int(count)) for weapon, count in weapons.items()),
+                )
+                for role_name, weapons in config.items()
+            )
+        else:
+            roles = tuple(
+                (role_name, tuple((weapon, int(count)) for weapon, count in weapons))
+                for role_name, weapons in config
+            )
+        return _compile(roles)
+
+    def to_config(self) -> list:
+        """Forme persistée, stable quel que soit le moteur (JSONB ne garde pas l'ordre des clés)"""
+        return [
+            [role_name, [[weapon, count] for weapon, count in weapons]]
+            for role_name, weapons in self.roles
+        ]
+
+    def weapons(self, role_name: str) -> tuple:
+        """Armes d'un rôle : ((weapon, count), ...)"""
+        for name, weapons in self.roles:
+            if name == role_name:
+                return weapons
+        return ()
+
+    def resolve(self, slot: int):
+        """Retourner (rôle, arme) d'un slot en O(log n), ou None s'il n'existe pas"""
+        if not 1 <= slot <= self.total:
+            return None
+        _, role_name, weapon, _ = self.blocks[bisect_right(self.starts, slot) - 1]
+        return role_name, weapon
+
+    def reassign(self, registrations):
+        """Répartir des inscriptions sur cette disposition, bloc (rôle, arme) par bloc"""
+        # Retourne (gardées, nouveau slot de chaque gardée, supprimées faute de place)
+        current_mapping = {}
+        for reg in registrations:
+            current_mapping.setdefault((reg.role_name, reg.weapon), []).append(reg)
+
+        kept, new_slots, dropped = [], [], []
+        for first_slot, role_name, weapon, count in self.blocks:
+            existing_regs = current_mapping.pop((role_name, weapon), [])
+
+            # Garder seulement le nombre de slots disponibles
+            kept.extend(existing_regs[:count])
+            new_slots.extend(
+                range(first_slot, first_slot + min(count, len(existing_regs)))
+            )
+            dropped.extend(existing_regs[count:])
+
+        # Les armes retirées de la configuration n'ont plus de slots
+        for existing_regs in current_mapping.values():
+            dropped.extend(existing_regs)
+
+        return kept, new_slots, dropped
+
+    def label(self, slot: int) -> str:
+        return self.labels[slot - 1]
+
+    def __eq__(self, other):
+        return isinstance(other, SlotLayout) and self.roles == other.roles
+
+    def __hash__(self):
+        return hash(self.roles)
+
+
+@lru_cache(maxsize=256)
+def _compile(roles: tuple) -> SlotLayout:
+    # Une même configuration n'est compilée qu'une fois
+    return SlotLayout(roles)
@@ -0,0 +1,144 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+import weakref
+from collections import Counter, deque
+from datetime import datetime
+
+# Tâche asyncio -> commande /party qu'elle exécute (renseigné par le cog)
+ACTIVE_COMMANDS = weakref.WeakKeyDictionary()
+
+
+def tag_command(name: str):
+    """Associer la tâche courante à une commande, pour étiqueter blocages et profils"""
+    task = asyncio.current_task()
+    if task is not None:
+        ACTIVE_COMMANDS[task] = name
+
+
+def active_command(loop):
+    """Commande de la tâche en cours sur la boucle (lisible depuis un autre thread)"""
+    task = asyncio.current_task(loop)
+    return ACTIVE_COMMANDS.get(task) if task is not None else None
+
+
+def collapse(frame) -> str:
+    """Pile au format « collapsed » (racine d'abord), agrégée par fonction"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class LoopWatchdog:
+    """Détecteur de blocages : retard de la boucle et pile du callback qui la bloque"""
+
+    def __init__(self, metrics, threshold: float, interval: float = 0.1):
+        self.metrics = metrics
+        self.threshold = threshold  # Blocage signalé au-delà (secondes)
+        self.interval = interval
+        self.stalls = deque(maxlen=20)  # (horodatage, durée, commande, pile)
+        self._beat = time.monotonic()
+        self._stopped = threading.Event()
+        self._task = None
+
+    def start(self):
+        """Démarrer depuis la boucle surveillée"""
+        self.loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        threading.Thread(target=self._watch, name="loop-watchdog", daemon=True).start()
+        print(f"🐕 Surveillance de la boucle (seuil {self.threshold * 1000:.0f} ms)")
+
+    def stop(self):
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _heartbeat(self):
+        # Le retard d'un sommeil court mesure l'attente des callbacks prêts
+        while True:
+            before = time.monotonic()
+            await asyncio.sleep(self.interval)
+            self._beat = time.monotonic()
+            lag = self._beat - before - self.interval
+            self.metrics.observe("hrzn_event_loop_lag_seconds", max(lag, 0.0))
+
+    def _watch(self):
+        # Thread séparé : il tourne même quand la boucle est bloquée
+        reported = None
+        while not self._stopped.wait(self.interval):
+            beat = self._beat
+            blocked = time.monotonic() - beat - self.interval
+            if blocked < self.threshold or reported == beat:
+                continue
+
+            # Un seul rapport par blocage
+            reported = beat
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is None:
+                continue
+            stack = "".join(traceback.format_stack(frame))
+            command = active_command(self.loop)
+
+            self.metrics.inc("hrzn_event_loop_stalls_total", command=command or "-")
+            self.stalls.append((datetime.now(), blocked, command, stack))
+            print(
+                f"🐢 Boucle bloquée depuis {blocked * 1000:.0f} ms "
+                f"(commande : {'/' + command if command else 'aucune'})\n{stack}"
+            )
+
+
+class SamplingProfiler:
+    """Profileur par échantillonnage du thread de la boucle, en piles « collapsed »"""
+
+    def __init__(self, output_dir: str, interval: float = 0.005):
+        self.output_dir = output_dir
+        self.interval = interval
+        self.running = False
+
+    async def run(self, seconds: float) -> str:
+        """Échantillonner la boucle pendant `seconds` ; retourne le fichier écrit"""
+        if self.running:
+            raise RuntimeError("Un profilage est déjà en cours")
+
+        self.running = True
+        loop = asyncio.get_running_loop()
+        try:
+            # L'échantillonneur tourne dans un thread : la boucle reste libre
+            return await asyncio.to_thread(
+                self._sample, loop, threading.get_ident(), seconds
+            )
+        finally:
+            self.running = False
+
+    def _sample(self, loop, thread_id: int, seconds: float) -> str:
+        stacks = Counter()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            frame = sys._current_frames().get(thread_id)
+            if frame is not None:
+                stack = collapse(frame)
+                command = active_command(loop)
+                if command:
+                    stack = f"/{command};{stack}"
+                stacks[stack] += 1
+            time.sleep(self.interval)
+
+        # Format lisible par flamegraph.pl, speedscope ou inferno
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(
+            self.output_dir, f"profile-{datetime.now():%Y%m%d-%H%M%S}.collapsed"
+        )
+        with open(path, "w") as file:
+            for stack, count in stacks.most_common():
+                file.write(f"{stack} {count}\n")
+        return path
@@ -0,0 +1,32 @@
+import os
+import tempfile
+import unittest
+from argparse import Namespace
+
+# config.py exige un token : aucune connexion à Discord n'est ouverte ici
+os.environ.setdefault("DISCORD_TOKEN", "test")
+
+from benchmarks.load_sim import Simulation
+
+
+class SimulationTestCase(unittest.IsolatedAsyncioTestCase):
+    """Cog réel chargé face au faux Discord du simulateur, sur une base SQLite temporaire"""
+
+    async def asyncSetUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.sim = Simulation(
+            Namespace(
+                rest_latency=1,
+                rate_limit=0,
+                seed=42,
+                database_url=f"sqlite+aiosqlite:///{self.directory.name}/test.db",
+            )
+        )
+        await self.sim.setup()
+        self.cog = self.sim.cog
+        self.db = self.sim.db
+
+    async def asyncTearDown(self):
+        await self.cog.cog_unload()
+        await self.db.close()
+        self.directory.cleanup()
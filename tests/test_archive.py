@@ -0,0 +1,89 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+# config.py exige un token : aucune connexion à Discord n'est ouverte ici
+os.environ.setdefault("DISCORD_TOKEN", "test")
+
+from sqlalchemy import select
+
+from database.archive import archive_batch
+from database.database import Database
+from database.models import (
+    Activity,
+    ArchivedActivity,
+    ArchivedRegistration,
+    Registration,
+)
+
+
+class ArchiveTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db = Database(f"sqlite+aiosqlite:///{self.directory.name}/test.db")
+        await self.db.create_schema()
+
+    async def asyncTearDown(self):
+        await self.db.close()
+        self.directory.cleanup()
+
+    async def create_finished(self, title: str, user_id: int) -> int:
+        """Activité terminée depuis longtemps, avec un inscrit"""
+        async with self.db.unit_of_work() as session:
+            activity = Activity(
+                message_id=user_id,
+                thread_id=user_id + 1,
+                channel_id=1,
+                guild_id=1,
+                title=title,
+                event_date=datetime.now() - timedelta(days=60),
+                roles_config=[["DPS", [["Bow", 1]]]],
+                reminders=[],
+                is_active=False,
+            )
+            session.add(activity)
+            await session.flush()
+            session.add(
+                Registration(
+                    activity_id=activity.id,
+                    user_id=user_id,
+                    role_name="DPS",
+                    weapon="Bow",
+                    slot_number=1,
+                )
+            )
+            return activity.id
+
+    async def archive(self) -> list:
+        async with self.db.unit_of_work() as session:
+            return await archive_batch(session, datetime.now(), 200)
+
+    async def test_archive_create_archive(self):
+        first = await self.create_finished("Raid 1", 100)
+        self.assertEqual(await self.archive(), [first])
+
+        # SQLite réattribue l'id de la ligne la plus haute une fois supprimée
+        second = await self.create_finished("Raid 2", 200)
+        self.assertEqual(second, first)
+        self.assertEqual(await self.archive(), [second])
+
+        async with self.db.unit_of_work() as session:
+            rows = (
+                await session.execute(
+                    select(ArchivedActivity.title, ArchivedRegistration.user_id)
+                    .join(
+                        ArchivedRegistration,
+                        ArchivedRegistration.activity_id == ArchivedActivity.id,
+                    )
+                    .order_by(ArchivedActivity.id)
+                )
+            ).all()
+            sources = (await session.scalars(select(ArchivedActivity.source_id))).all()
+
+        self.assertEqual(rows, [("Raid 1", 100), ("Raid 2", 200)])
+        self.assertEqual(sources, [first, second])
+
+
+if __name__ == "__main__":
+    unittest.main()
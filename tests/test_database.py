@@ -0,0 +1,60 @@
+import os
+import tempfile
+import unittest
+
+# config.py exige un token : aucune connexion à Discord n'est ouverte ici
+os.environ.setdefault("DISCORD_TOKEN", "test")
+
+from sqlalchemy import select, update
+
+from database.database import Database
+from database.models import Registration
+
+
+class SyncSessionAdapterTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        # Driver synchrone : la session passe par SyncSessionAdapter
+        self.db = Database(f"sqlite:///{self.directory.name}/test.db")
+        await self.db.create_schema()
+        async with self.db.unit_of_work() as session:
+            session.add_all(
+                Registration(
+                    activity_id=1,
+                    user_id=100 + slot,
+                    role_name="DPS",
+                    weapon="Bow",
+                    slot_number=slot,
+                )
+                for slot in (1, 2, 3)
+            )
+
+    async def asyncTearDown(self):
+        await self.db.close()
+        self.directory.cleanup()
+
+    async def test_results_are_buffered_in_worker_thread(self):
+        query = select(Registration.slot_number, Registration.user_id).order_by(
+            Registration.slot_number
+        )
+        async with self.db.unit_of_work() as session:
+            rows = await session.execute(query)
+            first = await session.execute(query)
+            users = await session.scalars(
+                select(Registration).order_by(Registration.slot_number)
+            )
+            updated = await session.execute(
+                update(Registration)
+                .where(Registration.slot_number > 1)
+                .values(weapon="Spear")
+            )
+        self.assertEqual(updated.rowcount, 2)
+
+        # Session fermée et connexion rendue : les lignes sont déjà en mémoire
+        self.assertEqual(rows.all(), [(1, 101), (2, 102), (3, 103)])
+        self.assertEqual(first.first(), (1, 101))
+        self.assertEqual([user.user_id for user in users], [101, 102, 103])
+
+
+if __name__ == "__main__":
+    unittest.main()
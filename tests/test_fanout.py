@@ -0,0 +1,79 @@
+import asyncio
+import random
+import unittest
+from types import SimpleNamespace
+
+import discord
+
+from services.fanout import FanOut, chunk_mentions
+from services.outbound import OutboundQueue
+
+
+class FakeChannel:
+    """Salon dont les envois ont une latence variable ; un 429 au besoin"""
+
+    def __init__(self, rate_limit_at=None):
+        self.id = 1
+        self.mention = "<#1>"
+        self.received = []
+        self.random = random.Random(42)
+        self.rate_limit_at = rate_limit_at
+
+    async def send(self, content):
+        await asyncio.sleep(self.random.uniform(0, 0.005))
+        if len(self.received) == self.rate_limit_at:
+            self.rate_limit_at = None
+            raise discord.RateLimited(0.01)
+        self.received.append(content)
+
+
+class FakeUser:
+    def __init__(self, error):
+        self.error = error
+        self.attempts = 0
+
+    async def send(self, content):
+        self.attempts += 1
+        raise self.error
+
+
+class FanOutTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.outbound = OutboundQueue(4, bucket_size=50)
+        self.outbound.start()
+        self.user = None
+        bot = SimpleNamespace(get_user=lambda user_id: self.user)
+        self.fanout = FanOut(bot, self.outbound, 8, False, 5)
+        self.user_ids = [10**17 + n for n in range(500)]
+
+    async def asyncTearDown(self):
+        await self.outbound.stop()
+
+    def expected(self, header):
+        return chunk_mentions(header, [f"<@{user_id}>" for user_id in self.user_ids])
+
+    async def test_chunks_arrive_in_order(self):
+        channel = FakeChannel()
+        await self.fanout.notify(channel, "⏰ Rappel", self.user_ids, "rappel")
+
+        self.assertGreater(len(channel.received), 3)
+        self.assertEqual(channel.received, self.expected("⏰ Rappel"))
+
+    async def test_rate_limited_chunks_resume_without_duplicates(self):
+        channel = FakeChannel(rate_limit_at=2)
+        await self.fanout.notify(channel, "🚨 MASS UP", self.user_ids, "start")
+
+        self.assertEqual(channel.received, self.expected("🚨 MASS UP"))
+
+    async def test_dm_not_retried_on_permanent_errors(self):
+        for error in (
+            discord.NotFound(SimpleNamespace(status=404, reason="Not Found"), ""),
+            discord.HTTPException(SimpleNamespace(status=400, reason="Bad"), ""),
+        ):
+            self.user = FakeUser(error)
+            self.assertFalse(await self.fanout.send_dm(1, "Rappel"))
+            self.assertEqual(self.user.attempts, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
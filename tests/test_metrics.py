@@ -0,0 +1,51 @@
+import asyncio
+import logging
+import unittest
+
+from services.metrics import Metrics, RateLimitLogHandler, label_key
+
+
+class RateLimitLogHandlerTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.metrics = Metrics()
+        self.logger = logging.getLogger("discord.http.test")
+        self.logger.propagate = False
+        self.handler = RateLimitLogHandler(self.metrics)
+        self.logger.addHandler(self.handler)
+
+    async def asyncTearDown(self):
+        self.logger.removeHandler(self.handler)
+
+    def counted(self) -> dict:
+        series = self.metrics._series["hrzn_discord_rate_limited_total"]
+        return {
+            scope: series.get(label_key({"scope": scope}), 0.0)
+            for scope in ("bucket", "global")
+        }
+
+    def rate_limited(self, is_global: bool):
+        # Messages de discord.http pour une 429, dans le même ordre et sans await
+        self.logger.warning(
+            "We are being rate limited. %s %s responded with 429. Retrying in %.2f seconds.",
+            "POST",
+            "/channels/1/messages",
+            1.0,
+        )
+        if is_global:
+            self.logger.warning(
+                "Global rate limit has been hit. Retrying in %.2f seconds.", 1.0
+            )
+
+    async def test_each_429_counted_once(self):
+        self.rate_limited(is_global=True)
+        self.rate_limited(is_global=False)
+        await asyncio.sleep(0)
+        self.assertEqual(self.counted(), {"bucket": 1.0, "global": 1.0})
+
+        self.rate_limited(is_global=False)
+        await asyncio.sleep(0)
+        self.assertEqual(self.counted(), {"bucket": 2.0, "global": 1.0})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import asyncio
+import unittest
+
+from services.outbound import COSMETIC, NORMAL, URGENT, OutboundQueue
+
+
+class OutboundQueueTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        # Seaux de 2 jetons rechargés en 50 ms : les salons se bloquent vite
+        self.queue = OutboundQueue(4, bucket_size=2, bucket_per=0.05)
+        self.sent = []
+
+    async def asyncTearDown(self):
+        await self.queue.stop()
+
+    def send(self, label, release=None):
+        async def factory():
+            self.sent.append(label)
+            if release is not None:
+                await release.wait()
+
+        return factory
+
+    async def test_priorities_and_blocked_channels(self):
+        futures = [self.queue.submit(1, COSMETIC, self.send(f"a{n}")) for n in range(5)]
+        futures.append(self.queue.submit(2, NORMAL, self.send("b")))
+        futures.append(self.queue.submit(1, URGENT, self.send("a-urgent")))
+        self.queue.start()
+        await asyncio.gather(*futures)
+
+        # L'urgent passe en tête ; le salon 2 n'attend pas le seau vide du salon 1
+        self.assertEqual(self.sent[:3], ["a-urgent", "b", "a0"])
+        self.assertEqual(
+            [label for label in self.sent if label.startswith("a")],
+            ["a-urgent", "a0", "a1", "a2", "a3", "a4"],
+        )
+        self.assertEqual(self.queue.depth(), {"urgent": 0, "normal": 0, "cosmetic": 0})
+
+    async def test_same_key_waits_for_inflight_send(self):
+        release = asyncio.Event()
+        self.queue.start()
+        first = self.queue.submit(1, COSMETIC, self.send("v1", release), key="embed")
+        await asyncio.sleep(0.01)
+
+        # Envoi en cours : les suivants de même clé fusionnent et attendent sa fin
+        self.queue.submit(1, COSMETIC, self.send("v2"), key="embed")
+        latest = self.queue.submit(1, COSMETIC, self.send("v3"), key="embed")
+        await asyncio.sleep(0.01)
+        self.assertEqual(self.sent, ["v1"])
+        self.assertEqual(self.queue.depth()["cosmetic"], 1)
+
+        release.set()
+        await asyncio.gather(first, latest)
+        self.assertEqual(self.sent, ["v1", "v3"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+# config.py exige un token : aucune connexion à Discord n'est ouverte ici
+os.environ.setdefault("DISCORD_TOKEN", "test")
+
+from database import queries
+from database.archive import finished_activities
+from database.database import Database
+
+
+def hot_queries():
+    """Requêtes exécutées à chaque commande ou au démarrage, avec des paramètres types"""
+    # Les instructions de database.queries elles-mêmes : le contrôle ne peut pas diverger
+    now = datetime.now()
+    statements = {
+        "activité par thread": (queries.ACTIVITY_BY_THREAD, {"thread_id": 1}),
+        "activités actives": (queries.ACTIVE_ACTIVITIES, {}),
+        "roster d'une activité": (queries.ROSTER, {"activity_id": 1}),
+        "inscrits d'une activité": (queries.REGISTERED_USERS, {"activity_id": 1}),
+        "rosters des activités actives": (queries.ACTIVE_ROSTERS, {}),
+        "pages d'une activité": (queries.PAGES, {"activity_id": 1}),
+        "pages des activités actives": (queries.ACTIVE_PAGES, {}),
+        "échéance et son activité": (queries.DEADLINE, {"job_id": 1}),
+        "échéance faite": (queries.JOB_DONE, {"job_id": 1}),
+        "échéances en retard": (queries.OVERDUE_JOBS, {"now": now}),
+        "fenêtre d'échéances": (
+            queries.JOBS_WINDOW,
+            {"since": now, "until": now + timedelta(hours=24)},
+        ),
+        "désinscription": (
+            queries.DELETE_REGISTRATIONS,
+            {"activity_id": 1, "user_id": 1},
+        ),
+        "pages de suite en trop": (
+            queries.DELETE_PAGES_FROM,
+            {"activity_id": 1, "page": 1},
+        ),
+        "activités à archiver": (
+            finished_activities(now - timedelta(days=30), 200),
+            {},
+        ),
+    }
+    for statement in queries.DELETE_ACTIVITY:
+        statements[f"suppression d'activité ({statement.table.name})"] = (
+            statement,
+            {"activity_id": 1},
+        )
+    return statements
+
+
+def check_query_plans(engine) -> list:
+    """Requêtes chaudes dont l'EXPLAIN QUERY PLAN parcourt une table, avec leur plan"""
+    failures = []
+    with engine.connect() as connection:
+        for name, (statement, params) in hot_queries().items():
+            # SQL réellement compilé, paramètres liés dans l'ordre des « ? »
+            compiled = statement.compile(dialect=engine.dialect)
+            values = compiled.construct_params(params)
+            plan = [
+                row[-1]
+                for row in connection.exec_driver_sql(
+                    f"EXPLAIN QUERY PLAN {compiled}",
+                    tuple(values[key] for key in compiled.positiontup),
+                )
+            ]
+            if any(step.startswith("SCAN") for step in plan):
+                failures.append((name, " | ".join(plan)))
+    return failures
+
+
+class QueryPlansTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db = Database(f"sqlite+aiosqlite:///{self.directory.name}/test.db")
+        await self.db.create_schema()
+
+    async def asyncTearDown(self):
+        await self.db.close()
+        self.directory.cleanup()
+
+    async def test_hot_queries_use_indexes(self):
+        self.assertEqual(await self.db.run_sync(check_query_plans), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+import asyncio
+import os
+import unittest
+
+# config.py exige un token : aucune connexion à Discord n'est ouverte ici
+os.environ.setdefault("DISCORD_TOKEN", "test")
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from benchmarks.load_sim import FakeInteraction, FakeUser, roles_for
+from cogs.activity import WeaponConfigModal
+from database.models import Registration
+from services.slot_layout import SlotLayout
+from tests.simulation import SimulationTestCase
+
+
+class RosterBatchTest(SimulationTestCase):
+    async def queued(self, activity_id: int, count: int):
+        """Attendre qu'exactement `count` commandes attendent dans la boîte aux lettres"""
+        while len(self.cog.actors._mailboxes.get(activity_id, ())) != count:
+            await asyncio.sleep(0)
+
+    async def test_join_reply_survives_rebalance_in_same_batch(self):
+        state, thread = await self.sim.create_activity(40)
+
+        # Occuper l'acteur : l'inscription et la réduction arrivent dans le même lot
+        released = asyncio.Event()
+
+        async def gate(session, state):
+            await released.wait()
+
+        gated = asyncio.create_task(self.cog.actors.submit(state.id, gate))
+        await self.queued(state.id, 1)
+        await self.queued(state.id, 0)
+
+        join = asyncio.create_task(
+            self.sim.command("party_join", thread, 500, state.layout.total)
+        )
+        await self.queued(state.id, 1)
+
+        modal = WeaponConfigModal(
+            title=state.title,
+            event_datetime=state.event_date,
+            leader=FakeUser(1),
+            ping_role=FakeUser(2),
+            cog=self.cog,
+            activity_id=state.id,
+            edit_mode=True,
+        )
+        interaction = FakeInteraction(self.sim.rest, thread, FakeUser(1), 0)
+        shrink = asyncio.create_task(
+            modal.update_existing_activity(
+                interaction, SlotLayout.from_config(roles_for(3))
+            )
+        )
+        await self.queued(state.id, 2)
+
+        released.set()
+        await gated
+        reply = await join
+        await shrink
+
+        # La réponse décrit le slot tel qu'il était quand l'inscription a été faite
+        self.assertIn("**40** (DPS - Bow)", reply)
+        self.assertEqual(state.user_to_slot, {500: 3})
+        self.assertTrue(interaction.followup.messages[-1].startswith("✅"))
+
+    async def test_failed_batch_restores_roster_without_reload(self):
+        state, thread = await self.sim.create_activity(10)
+        await self.sim.command("party_join", thread, 500, 1)
+        before = state.snapshot()
+
+        def locked(*args):
+            raise OperationalError("COMMIT", {}, Exception("database is locked"))
+
+        async def claim_then_fail(session, state):
+            await self.cog.claim_slot(session, state, 2, 501)
+            locked()
+
+        # La relecture échoue aussi : seule la copie d'avant le lot peut réparer
+        self.cog.registry.load = locked
+        with self.assertRaises(OperationalError):
+            await self.cog.actors.submit(state.id, claim_then_fail)
+
+        self.assertEqual(state.snapshot(), before)
+        self.assertIs(self.cog.registry.get_by_thread(thread.id), state)
+        async with self.db.unit_of_work() as session:
+            rows = (
+                await session.execute(
+                    select(Registration.slot_number, Registration.user_id)
+                )
+            ).all()
+        self.assertEqual(rows, [(1, 500)])
+
+    async def test_only_claims_turn_constraint_conflicts_into_refusals(self):
+        state, thread = await self.sim.create_activity(10)
+        interaction = FakeInteraction(self.sim.rest, thread, FakeUser(500), 0)
+
+        def conflict(constraint):
+            async def command(session, state, *args):
+                raise IntegrityError("INSERT", {}, Exception(constraint))
+
+            return command
+
+        # Une autre écriture a pris le slot : refus propre de l'inscription
+        self.cog.claim_slot = conflict("uq_registrations_activity_slot")
+        self.assertEqual(
+            await self.cog.submit_claim(interaction, state, 1, 500),
+            (True, ("slot", None)),
+        )
+
+        # Toute autre commande remonte sa propre erreur
+        with self.assertRaises(IntegrityError):
+            await self.cog.submit(interaction, state, conflict("pages"), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,144 @@
+import os
+import unittest
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+# config.py exige un token : aucune connexion à Discord n'est ouverte ici
+os.environ.setdefault("DISCORD_TOKEN", "test")
+
+import discord
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+
+from config import Config
+from database.models import Activity, ScheduledJob
+from tests.simulation import SimulationTestCase
+
+
+class SchedulerWindowTest(SimulationTestCase):
+    def horizon_deadline(self):
+        return self.cog.scheduler._entries["horizon"][0]
+
+    async def test_failed_reload_keeps_window_and_retries(self):
+        horizon_end = self.cog.horizon_end
+        self.assertEqual(self.horizon_deadline(), horizon_end)
+
+        unit_of_work = self.cog.db.unit_of_work
+
+        def busy():
+            raise OperationalError("SELECT", {}, Exception("database is locked"))
+
+        self.cog.db.unit_of_work = busy
+        for failures in (1, 2):
+            with self.assertRaises(OperationalError):
+                await self.cog.on_deadline("horizon")
+
+            # La fenêtre n'a pas avancé et un nouvel essai est planifié, plus tard à chaque échec
+            self.assertEqual(self.cog.horizon_end, horizon_end)
+            retry = timedelta(
+                seconds=Config.SCHEDULER_RETRY_SECONDS * 2 ** (failures - 1)
+            )
+            self.assertAlmostEqual(
+                self.horizon_deadline(),
+                datetime.now() + retry,
+                delta=timedelta(seconds=5),
+            )
+
+        self.cog.db.unit_of_work = unit_of_work
+        await self.cog.on_deadline("horizon")
+
+        self.assertGreater(self.cog.horizon_end, horizon_end)
+        self.assertEqual(self.horizon_deadline(), self.cog.horizon_end)
+        self.assertEqual(self.cog.horizon_failures, 0)
+
+    async def test_failed_startup_catch_up_is_retried(self):
+        state, _ = await self.sim.create_activity(5)
+
+        # Redémarrage sans fenêtre chargée, base occupée pendant le rattrapage
+        self.cog.scheduler.stop()
+        self.cog.scheduler.cancel_group(state.id)
+        self.cog.horizon_end = None
+        unit_of_work = self.cog.db.unit_of_work
+
+        def busy():
+            raise OperationalError("SELECT", {}, Exception("database is locked"))
+
+        self.cog.db.unit_of_work = busy
+        await self.cog.start_scheduler()
+
+        # L'ordonnanceur tourne et réessaiera le rattrapage
+        self.assertIsNotNone(self.cog.scheduler._task)
+        self.assertIsNone(self.cog.horizon_end)
+        self.assertAlmostEqual(
+            self.horizon_deadline(),
+            datetime.now() + timedelta(seconds=Config.SCHEDULER_RETRY_SECONDS),
+            delta=timedelta(seconds=5),
+        )
+
+        self.cog.db.unit_of_work = unit_of_work
+        await self.cog.on_deadline("horizon")
+
+        self.assertIsNotNone(self.cog.horizon_end)
+        self.assertEqual(self.horizon_deadline(), self.cog.horizon_end)
+        self.assertIn(state.id, self.cog.scheduler._groups)
+
+    async def start_job(self):
+        """Activité créée puis son thread sorti des caches : chaque échéance le recharge"""
+        state, thread = await self.sim.create_activity(5)
+        del self.sim.bot.channels[thread.id]
+        self.cog.channels.pop(thread.id, None)
+        async with self.db.unit_of_work() as session:
+            job_id = await session.scalar(
+                select(ScheduledJob.id).filter_by(activity_id=state.id, kind="start")
+            )
+        return state.id, job_id
+
+    async def job_and_activity(self, activity_id, job_id):
+        async with self.db.unit_of_work() as session:
+            status = await session.scalar(
+                select(ScheduledJob.status).filter_by(id=job_id)
+            )
+            is_active = await session.scalar(
+                select(Activity.is_active).filter_by(id=activity_id)
+            )
+        return status, is_active
+
+    async def test_start_retried_while_thread_unreachable(self):
+        activity_id, job_id = await self.start_job()
+
+        async def unavailable(channel_id):
+            response = SimpleNamespace(status=503, reason="Service Unavailable")
+            raise discord.HTTPException(response, "")
+
+        self.sim.bot.fetch_channel = unavailable
+        await self.cog.on_deadline(job_id)
+
+        # L'échéance reste en attente et revient plus tard
+        self.assertEqual(
+            await self.job_and_activity(activity_id, job_id), ("pending", True)
+        )
+        fire_at = self.cog.scheduler._entries[job_id][0]
+        self.assertAlmostEqual(
+            fire_at,
+            datetime.now() + timedelta(seconds=Config.SCHEDULER_RETRY_SECONDS),
+            delta=timedelta(seconds=5),
+        )
+
+    async def test_start_with_deleted_thread_ends_activity(self):
+        activity_id, job_id = await self.start_job()
+
+        async def deleted(channel_id):
+            response = SimpleNamespace(status=404, reason="Not Found")
+            raise discord.NotFound(response, "Unknown Channel")
+
+        self.sim.bot.fetch_channel = deleted
+        await self.cog.on_deadline(job_id)
+
+        # Plus rien à démarrer : l'activité devient archivable
+        self.assertEqual(
+            await self.job_and_activity(activity_id, job_id), ("done", False)
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
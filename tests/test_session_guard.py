@@ -0,0 +1,59 @@
+import os
+import unittest
+
+# config.py exige un token : aucune connexion à Discord n'est ouverte ici
+os.environ.setdefault("DISCORD_TOKEN", "test")
+
+from sqlalchemy import select
+
+from database.models import ScheduledJob
+from database.session_guard import HELD_DURING_IO
+from tests.simulation import SimulationTestCase
+
+
+class SessionGuardTest(SimulationTestCase):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        HELD_DURING_IO.clear()
+
+    async def asyncTearDown(self):
+        await super().asyncTearDown()
+        HELD_DURING_IO.clear()
+
+    async def test_guard_counts_rest_calls_inside_unit_of_work(self):
+        async with self.db.unit_of_work():
+            await self.sim.rest.call("channel.send")
+        self.assertEqual(HELD_DURING_IO, {"channel.send": 1})
+
+    async def test_commands_release_session_before_rest_calls(self):
+        # create_new_activity : activité, thread et message créés
+        state, thread = await self.sim.create_activity(10)
+
+        # claim_slot / release_slot via la boîte aux lettres de l'activité
+        for user_id in range(100, 105):
+            reply = await self.sim.command("party_join", thread, user_id, user_id - 99)
+            self.assertTrue(reply.startswith("✅"), reply)
+        await self.sim.command("party_leave", thread, 100)
+
+        # on_deadline : rappels et démarrage, lecture et écriture autour des envois
+        async with self.db.unit_of_work() as session:
+            job_ids = (
+                await session.scalars(
+                    select(ScheduledJob.id).filter_by(
+                        activity_id=state.id, status="pending"
+                    )
+                )
+            ).all()
+        self.assertTrue(job_ids)
+        for job_id in job_ids:
+            await self.cog.on_deadline(job_id)
+
+        # Éditions d'embed regroupées envoyées avant de vérifier
+        await self.cog.embed_updater.flush_all()
+
+        self.assertGreater(sum(self.sim.rest.calls.values()), 0)
+        self.assertEqual(HELD_DURING_IO, {})
+
+
+if __name__ == "__main__":
+    unittest.main()